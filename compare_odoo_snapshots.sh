@@ -0,0 +1,53 @@
+#!/bin/bash
+#
+# compare_odoo_snapshots.sh
+#
+# Export the module graph snapshot of two Odoo servers and print how they
+# differ (added/removed modules and edges, state changes, new cycles).
+#
+# Workflow:
+#   1. Download a snapshot from each server via /api/graph/snapshot.
+#   2. Post both snapshots to /api/graph/snapshot/diff on the first server.
+#
+# Requirements:
+#   - jq (for JSON parsing)
+#   - Both Odoo servers running with the GraphAPI controllers loaded
+#
+# Usage:
+#   chmod +x compare_odoo_snapshots.sh
+#   ./compare_odoo_snapshots.sh [BASE_URL_A] [BASE_URL_B]
+
+BASE_URL_A="${1:-http://odoo1.local:8070}"
+BASE_URL_B="${2:-http://odoo1.local:8069}"
+SNAPSHOT_A="snapshot_a.json"
+SNAPSHOT_B="snapshot_b.json"
+
+GREEN='\033[0;32m'
+BLUE='\033[0;34m'
+YELLOW='\033[1;33m'
+NC='\033[0m' # No Color
+
+echo -e "${BLUE}=== Step 1: Export module graph snapshots ===${NC}"
+for pair in "$BASE_URL_A:$SNAPSHOT_A" "$BASE_URL_B:$SNAPSHOT_B"; do
+  url="${pair%:*}"
+  file="${pair##*:}"
+  if ! curl -sf "$url/api/graph/snapshot" -o "$file"; then
+    echo -e "${YELLOW}Could not export snapshot from ${url}. Aborting.${NC}"
+    exit 1
+  fi
+  echo -e "${GREEN}${url}:${NC}" \
+    "$(jq '.modules | length' "$file") modules," \
+    "$(jq '.edges | length' "$file") edges"
+done
+echo -e "${BLUE}-----------------------------------------------------${NC}"
+
+echo -e "${BLUE}=== Step 2: Diff snapshots ===${NC}"
+jq -n --slurpfile a "$SNAPSHOT_A" --slurpfile b "$SNAPSHOT_B" '{
+    "jsonrpc": "2.0",
+    "method": "call",
+    "params": {"snapshot_a": $a[0], "snapshot_b": $b[0]},
+    "id": null
+  }' | curl -s -X POST "$BASE_URL_A/api/graph/snapshot/diff" \
+    -H "Content-Type: application/json" \
+    --data-binary @- | jq .
+echo -e "${BLUE}-----------------------------------------------------${NC}"
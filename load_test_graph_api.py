@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+load_test_graph_api.py
+
+Load generator for the graph HTTP API (/api/graph/* and
+/graph_module_dependency/* routes).
+
+Replays a weighted mix of graph calls at a target concurrency and rate, then
+reports per endpoint: request count, error rate, throughput, p50/p95/p99
+latency and payload sizes. Only the Python standard library is used.
+
+The mix is read from a scenario file (see load_test_fixtures/scenario.json):
+
+    [{"name": "module", "path": "/api/graph/module", "weight": 3,
+      "params": {"module_ids": [1], "options": {"max_depth": 2}}},
+     {"name": "export_dot", "path": "/api/graph/export", "type": "http",
+      "query": {"graph": "module", "ids": "1", "format": "dot"}}]
+
+JSON-RPC calls ("type": "json", the default) are POSTed as
+{"jsonrpc": "2.0", "method": "call", "params": ...}; a response carrying an
+"error" member (JSON-RPC error, or the error dict of the
+/graph_module_dependency/* routes) counts as an error.
+
+Usage:
+    # Against a local Odoo
+    ./load_test_graph_api.py --base-url http://localhost:8069 -c 8 --rate 20 --duration 60
+
+    # Against the bundled stub server, serving recorded fixtures
+    ./load_test_graph_api.py --stub -c 16 --requests 2000
+
+    # Record fresh fixtures from a running Odoo for the stub server
+    ./load_test_graph_api.py --base-url http://localhost:8069 --record load_test_fixtures
+
+    # Only run the stub server (e.g. to develop the frontend or other tools)
+    ./load_test_graph_api.py --serve-stub --stub-port 8070
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "load_test_fixtures")
+
+
+# ---------------------------------------------------------------------------
+# Scenario
+# ---------------------------------------------------------------------------
+
+def load_scenario(path):
+    """Load and validate the list of weighted calls of a scenario file."""
+    with open(path) as f:
+        calls = json.load(f)
+    for call in calls:
+        if "name" not in call or "path" not in call:
+            raise ValueError("Every scenario call needs a 'name' and a 'path': %r" % call)
+        call.setdefault("type", "json")
+        call.setdefault("weight", 1)
+        call.setdefault("params", {})
+        call.setdefault("query", {})
+    return calls
+
+
+def fixture_name(call):
+    """File name of the recorded response of a scenario call."""
+    extension = "json" if call["type"] == "json" else call.get("extension", "txt")
+    return "%s.%s" % (re.sub(r"[^A-Za-z0-9_.-]+", "_", call["name"]), extension)
+
+
+def build_request(base_url, call, compressed=False):
+    """Build the urllib request of a scenario call."""
+    url = base_url.rstrip("/") + call["path"]
+    headers = {"Accept-Encoding": "gzip" if compressed else "identity"}
+    data = None
+    if call["type"] == "json":
+        data = json.dumps({
+            "jsonrpc": "2.0",
+            "method": "call",
+            "params": call["params"],
+            "id": random.randint(1, 1 << 30),
+        }).encode()
+        headers["Content-Type"] = "application/json"
+    elif call["query"]:
+        url += "?" + urllib.parse.urlencode(call["query"])
+    return urllib.request.Request(url, data=data, headers=headers, method="POST" if data else "GET")
+
+
+def is_error_body(call, body, content_encoding):
+    """Whether a 200 response carries an application-level error."""
+    if call["type"] != "json":
+        return False
+    try:
+        if content_encoding == "gzip":
+            body = gzip.decompress(body)
+        payload = json.loads(body)
+    except (ValueError, OSError):
+        return True
+    if "error" in payload:
+        return True
+    result = payload.get("result")
+    return isinstance(result, dict) and "error" in result
+
+
+# ---------------------------------------------------------------------------
+# Load generator
+# ---------------------------------------------------------------------------
+
+class Sample:
+    __slots__ = ("name", "latency", "size", "error")
+
+    def __init__(self, name, latency, size, error):
+        self.name = name
+        self.latency = latency
+        self.size = size
+        self.error = error
+
+
+class LoadGenerator:
+    """Run scenario calls from a pool of worker threads.
+
+    With a target rate, requests are scheduled at fixed intervals (open
+    loop) and latency is measured from the scheduled start, so that time
+    spent waiting for a free worker counts as latency instead of being
+    hidden (coordinated omission). Without a rate, workers loop as fast as
+    the server answers.
+    """
+
+    def __init__(self, base_url, calls, concurrency, rate=0.0, timeout=60.0, compressed=False, seed=None):
+        self.base_url = base_url
+        self.calls = calls
+        self.weights = [call["weight"] for call in calls]
+        self.concurrency = concurrency
+        self.rate = rate
+        self.timeout = timeout
+        self.compressed = compressed
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.samples = []
+        self.issued = 0
+
+    def _next_slot(self, deadline, max_requests):
+        """Reserve the next request: returns (call, scheduled time) or None when done."""
+        with self.lock:
+            if max_requests and self.issued >= max_requests:
+                return None
+            scheduled = self.start + self.issued / self.rate if self.rate else time.monotonic()
+            if deadline and scheduled >= deadline:
+                return None
+            self.issued += 1
+            call = self.random.choices(self.calls, weights=self.weights)[0]
+        return call, scheduled
+
+    def _worker(self, deadline, max_requests):
+        while True:
+            slot = self._next_slot(deadline, max_requests)
+            if slot is None:
+                return
+            call, scheduled = slot
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            sample = self._execute(call, scheduled if self.rate else time.monotonic())
+            with self.lock:
+                self.samples.append(sample)
+
+    def _execute(self, call, started):
+        request = build_request(self.base_url, call, self.compressed)
+        size, error = 0, False
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = response.read()
+                size = len(body)
+                error = is_error_body(call, body, response.headers.get("Content-Encoding"))
+        except urllib.error.HTTPError as e:
+            size, error = len(e.read() or b""), True
+        except (urllib.error.URLError, OSError):
+            error = True
+        return Sample(call["name"], time.monotonic() - started, size, error)
+
+    def run(self, duration=None, max_requests=None):
+        """Run the load until the duration elapsed or max_requests were sent.
+
+        Returns:
+            Wall-clock duration of the run in seconds
+        """
+        self.start = time.monotonic()
+        deadline = self.start + duration if duration else None
+        workers = [
+            threading.Thread(target=self._worker, args=(deadline, max_requests), daemon=True)
+            for _i in range(self.concurrency)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return time.monotonic() - self.start
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(samples, elapsed):
+    """Aggregate samples per endpoint, plus a "TOTAL" row."""
+    groups = defaultdict(list)
+    for sample in samples:
+        groups[sample.name].append(sample)
+        groups["TOTAL"].append(sample)
+
+    report = {}
+    for name, group in groups.items():
+        latencies = sorted(sample.latency for sample in group)
+        sizes = [sample.size for sample in group]
+        errors = sum(sample.error for sample in group)
+        report[name] = {
+            "requests": len(group),
+            "errors": errors,
+            "error_rate": errors / len(group),
+            "throughput": len(group) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "max_ms": latencies[-1] * 1000,
+            "avg_bytes": sum(sizes) / len(sizes),
+            "max_bytes": max(sizes),
+        }
+    return report
+
+
+REPORT_COLUMNS = (
+    # (title, key, scale)
+    ("reqs", "requests", 1),
+    ("err%", "error_rate", 100),
+    ("req/s", "throughput", 1),
+    ("p50 ms", "p50_ms", 1),
+    ("p95 ms", "p95_ms", 1),
+    ("p99 ms", "p99_ms", 1),
+    ("max ms", "max_ms", 1),
+    ("avg KB", "avg_bytes", 1 / 1024),
+    ("max KB", "max_bytes", 1 / 1024),
+)
+
+
+def print_report(report, elapsed):
+    print("Ran for %.1fs" % elapsed)
+    print("%-28s" % "endpoint" + "".join("%9s" % title for title, _key, _scale in REPORT_COLUMNS))
+    for name in sorted(name for name in report if name != "TOTAL") + ["TOTAL"]:
+        row = report[name]
+        print("%-28s" % name[:28] + "".join(
+            "%9d" % row[key] if key == "requests" else "%9.1f" % (row[key] * scale)
+            for _title, key, scale in REPORT_COLUMNS
+        ))
+
+
+# ---------------------------------------------------------------------------
+# Fixtures: recording and stub server
+# ---------------------------------------------------------------------------
+
+def record_fixtures(base_url, calls, directory, timeout=120.0):
+    """Call every scenario entry once and store its response as a fixture."""
+    os.makedirs(directory, exist_ok=True)
+    for call in calls:
+        with urllib.request.urlopen(build_request(base_url, call), timeout=timeout) as response:
+            body = response.read()
+        if call["type"] == "json":
+            body = json.dumps(json.loads(body).get("result"), indent=1).encode()
+        with open(os.path.join(directory, fixture_name(call)), "wb") as f:
+            f.write(body)
+        print("Recorded %s (%d bytes)" % (fixture_name(call), len(body)))
+
+
+def make_stub_handler(calls, directory, latency_ms=0.0):
+    """Build a request handler serving the fixtures of the scenario calls by path."""
+    routes = {}
+    for call in calls:
+        path = os.path.join(directory, fixture_name(call))
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                # The first recorded call of a path answers all its requests
+                routes.setdefault(call["path"], (call["type"], f.read()))
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _serve(self):
+            route = routes.get(urllib.parse.urlsplit(self.path).path)
+            if route is None:
+                self._reply(404, b'{"error": "no fixture"}', "application/json")
+                return
+            kind, body = route
+            length = int(self.headers.get("Content-Length") or 0)
+            request_body = self.rfile.read(length) if length else b""
+            if latency_ms:
+                time.sleep(latency_ms / 1000.0)
+            if kind == "json":
+                try:
+                    request_id = json.loads(request_body or b"{}").get("id")
+                except ValueError:
+                    request_id = None
+                body = b'{"jsonrpc": "2.0", "id": %s, "result": %s}' % (json.dumps(request_id).encode(), body)
+                content_type = "application/json"
+            else:
+                content_type = "text/plain; charset=utf-8"
+            if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                self._reply(200, gzip.compress(body), content_type, encoding="gzip")
+            else:
+                self._reply(200, body, content_type)
+
+        def _reply(self, status, body, content_type, encoding=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST = _serve
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+class StubServer(ThreadingHTTPServer):
+    # The default backlog of 5 makes the kernel drop connections of busy
+    # runs, adding 1s SYN retries to the measured latency
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def start_stub_server(calls, directory, port=0, latency_ms=0.0):
+    """Start the stub server in a background thread, returns the server."""
+    server = StubServer(("127.0.0.1", port), make_stub_handler(calls, directory, latency_ms))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1], formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8069", help="Odoo server URL")
+    parser.add_argument("--scenario", default=os.path.join(DEFAULT_FIXTURES, "scenario.json"),
+                        help="JSON file with the weighted call mix")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Number of concurrent clients")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="Target requests per second over all clients (0: as fast as possible)")
+    parser.add_argument("--duration", type=float, default=None, help="Run time in seconds")
+    parser.add_argument("--requests", type=int, default=None, help="Number of requests to send")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Timeout of one request in seconds")
+    parser.add_argument("--compressed", action="store_true", help="Ask for gzip responses (wire sizes are reported)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the call mix, for reproducible runs")
+    parser.add_argument("--json", dest="json_output", help="Also write the report to this JSON file")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="Fixture directory of the stub server")
+    parser.add_argument("--stub", action="store_true", help="Run against the bundled stub server")
+    parser.add_argument("--serve-stub", action="store_true", help="Only run the stub server")
+    parser.add_argument("--stub-port", type=int, default=0, help="Port of the stub server (default: any free port)")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="Latency added by the stub server")
+    parser.add_argument("--record", metavar="DIRECTORY", help="Record the scenario responses as fixtures and exit")
+    args = parser.parse_args(argv)
+
+    calls = load_scenario(args.scenario)
+
+    if args.record:
+        record_fixtures(args.base_url, calls, args.record)
+        return 0
+
+    if args.stub or args.serve_stub:
+        server = start_stub_server(calls, args.fixtures, args.stub_port, args.stub_latency_ms)
+        base_url = "http://127.0.0.1:%s" % server.server_address[1]
+        if args.serve_stub:
+            print("Stub server listening on %s (Ctrl+C to stop)" % base_url)
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                return 0
+    else:
+        base_url = args.base_url
+
+    if not args.duration and not args.requests:
+        args.duration = 30.0
+    generator = LoadGenerator(
+        base_url, calls, args.concurrency, args.rate, args.timeout, args.compressed, args.seed
+    )
+    print("Load testing %s with %d clients%s..." % (
+        base_url, args.concurrency, " at %.1f req/s" % args.rate if args.rate else ""
+    ))
+    elapsed = generator.run(args.duration, args.requests)
+    if not generator.samples:
+        print("No request was sent.")
+        return 1
+
+    report = summarize(generator.samples, elapsed)
+    print_report(report, elapsed)
+    if args.json_output:
+        with open(args.json_output, "w") as f:
+            json.dump({"elapsed": elapsed, "endpoints": report}, f, indent=1)
+    return 1 if report["TOTAL"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
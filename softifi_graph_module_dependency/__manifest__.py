@@ -17,7 +17,7 @@
     "author": "Farhat BAAROUN",
     "website": "https://github.com/GldzzPro/graph_module_dependency",
     "category": "Tools",
-    "version": "17.0.1.0.0",
+    "version": "17.0.1.1.0",
     "depends": [
         "base",
         "web",
@@ -27,9 +27,11 @@
         "security/ir.model.access.csv",
         "security/module_security.xml", 
         "views/dependency_menus.xml",
+        "data/ir_cron.xml",
     ],
     "assets": {
         "web.assets_backend": [
+            "softifi_graph_module_dependency/static/src/components/graph_network/vis_network.js",
             "softifi_graph_module_dependency/static/src/components/module_graph/GraphModuleComponent.js",
             "softifi_graph_module_dependency/static/src/components/model_graph/GraphModelComponent.js",
             "softifi_graph_module_dependency/static/src/components/module_graph/module_graph.xml",
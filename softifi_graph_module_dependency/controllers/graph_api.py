@@ -1,7 +1,27 @@
 # -*- coding: utf-8 -*-
+import json
+
+from werkzeug.exceptions import BadRequest, NotFound
+
 from odoo import http
 from odoo.http import request
 
+from ..models.graph_export import (
+    EXPORT_FORMATS,
+    MODEL_EDGE_KEYS,
+    MODEL_NODE_KEYS,
+    MODULE_EDGE_KEYS,
+    MODULE_NODE_KEYS,
+    export_graph,
+)
+
+MODULE_EXPORT_GRAPHS = ('module', 'reverse', 'category', 'category_reverse')
+
+CATALOG_MODELS = {
+    'module': 'ir.module.module',
+    'model': 'ir.model',
+}
+
 
 class GraphAPI(http.Controller):
     """Controller providing JSON-RPC endpoints for graph functionality."""
@@ -38,6 +58,7 @@ class GraphAPI(http.Controller):
                 - max_depth: Maximum depth to traverse in the graph
                 - stop_domains: List of domains to stop traversal
                 - exclude_domains: List of domains to exclude modules
+                - aggregate: If "category", return one weighted node per category
         """
         result = request.env['ir.module.module'].sudo().get_category_module_graph(
             category_prefixes,
@@ -58,6 +79,7 @@ class GraphAPI(http.Controller):
                 - max_depth: Maximum depth to traverse in the graph
                 - stop_domains: List of domains to stop traversal
                 - exclude_domains: List of domains to exclude modules
+                - aggregate: If "category", return one weighted node per category
         """
         result = request.env['ir.module.module'].sudo().get_reverse_category_module_graph(
             category_prefixes,
@@ -65,10 +87,194 @@ class GraphAPI(http.Controller):
         )
         return result
 
+    @http.route('/api/graph/category/expand', type='json', auth='public', csrf=False)
+    def expand_category_node(self, category_prefixes, category_id, options, **kwargs):
+        """
+        Expand one category node of a graph requested with aggregate="category".
+
+        Args:
+            category_prefixes: Category prefixes the collapsed graph was built from
+            category_id: Id of the category to expand (false for uncategorized modules)
+            options: Same options as the collapsed graph request, plus
+                - reverse: If True, the collapsed graph follows reverse dependencies
+        """
+        result = request.env['ir.module.module'].sudo().expand_category_graph_node(
+            category_prefixes,
+            category_id,
+            options
+        )
+        return result
+
+    @http.route('/api/graph/installation', type='json', auth='public', csrf=False)
+    def installation_graph(self, options=None, **kwargs):
+        """
+        Get the graph of all installed modules and their dependencies.
+
+        Args:
+            options: Dictionary of options controlling graph behavior
+                - include_exclusions: Whether to include exclusion edges
+        """
+        result = request.env['ir.module.module'].sudo().get_installation_graph(options or {})
+        return result
+
+    @http.route('/api/graph/cycles', type='json', auth='public', csrf=False)
+    def cycle_report(self, options=None, **kwargs):
+        """
+        Get all the cycles of the module graph of the installation.
+
+        Args:
+            options: Dictionary of options
+                - include_exclusions: Whether exclusion edges close cycles too (default false)
+                - installed_only: Only consider installed modules (default true)
+        """
+        result = request.env['ir.module.module'].sudo().get_cycle_report(options or {})
+        return result
+
+    @http.route('/api/graph/impact', type='json', auth='public', csrf=False)
+    def impact_analysis(self, module_ids, action='uninstall', **kwargs):
+        """
+        Get the installed modules affected by uninstalling or upgrading modules.
+
+        Args:
+            module_ids: List of module IDs to uninstall or upgrade
+            action: "uninstall" (default) or "upgrade"
+        """
+        result = request.env['ir.module.module'].sudo().impact_analysis(
+            module_ids,
+            action
+        )
+        return result
+
     @http.route('/api/graph/model', type='json', auth='public', csrf=False)
     def model_graph(self, model_ids, options, **kwargs):
-        result = request.env['ir.model'].sudo().get_model_relation_graph(
-            model_ids,
-            options.get('max_depth', None)
+        """
+        Get model relation graph data.
+
+        Args:
+            model_ids: List of ir.model IDs to start from
+            options: Dictionary of options controlling graph behavior
+                - max_depth: Maximum depth to traverse in the graph
+                - direction: "forward" (default) or "reverse" to find the models
+                  referencing the given ones
+                - ttypes: Relational field types to follow
+                - exclude_models: Technical names of (hub) models not to follow
+                - exclude_transient: Skip transient models
+                - exclude_abstract: Skip abstract models in reverse mode
+                - modules: Only reach models defined or extended by these modules
+        """
+        result = request.env['ir.model'].sudo().browse(model_ids).get_model_relation_graph(
+            options.get('max_depth', 2),
+            options=options
+        )
+        return result
+
+    @http.route('/api/graph/catalog/<string:kind>', type='http', auth='public', methods=['GET'], csrf=False)
+    def graph_catalog(self, kind, **kwargs):
+        """
+        Get the module or model list of the graph components, in compact form.
+
+        The response carries an ETag tied to the module graph generation, so
+        browsers revalidate it with a 304 until modules change.
+
+        Args:
+            kind: "module" or "model"
+        """
+        if kind not in CATALOG_MODELS:
+            raise NotFound()
+        Model = request.env[CATALOG_MODELS[kind]].sudo()
+        etag = Model._get_graph_catalog_etag()
+        headers = [
+            ('ETag', '"%s"' % etag),
+            ('Cache-Control', 'private, no-cache'),
+        ]
+        if request.httprequest.if_none_match.contains(etag):
+            return request.make_response(b'', headers=headers, status=304)
+        return request.make_response(
+            json.dumps(Model._get_graph_catalog(), separators=(',', ':')),
+            headers=headers + [('Content-Type', 'application/json')],
+        )
+
+    @http.route('/api/graph/snapshot', type='http', auth='public', methods=['GET'], csrf=False)
+    def module_graph_snapshot(self, **kwargs):
+        """
+        Download a versioned snapshot of the full module graph of this database.
+        """
+        snapshot = request.env['ir.module.module'].sudo().export_graph_snapshot()
+        filename = "module_graph_%s_%s.json" % (
+            snapshot['database'],
+            snapshot['created_at'].replace(' ', '_').replace(':', ''),
+        )
+        return request.make_response(
+            json.dumps(snapshot, indent=1),
+            headers=[
+                ('Content-Type', 'application/json'),
+                ('Content-Disposition', http.content_disposition(filename)),
+            ],
+        )
+
+    @http.route('/api/graph/snapshot/diff', type='json', auth='public', csrf=False)
+    def module_graph_snapshot_diff(self, snapshot_a, snapshot_b, **kwargs):
+        """
+        Compare two module graph snapshots.
+
+        Args:
+            snapshot_a: Reference snapshot (as returned by /api/graph/snapshot)
+            snapshot_b: Snapshot to compare against the reference
+        """
+        result = request.env['ir.module.module'].sudo().diff_graph_snapshots(
+            snapshot_a,
+            snapshot_b
+        )
+        return result
+
+    @http.route('/api/graph/export', type='http', auth='public', methods=['GET', 'POST'], csrf=False)
+    def export_graph(self, graph='module', format='dot', ids='', category_prefixes='', options='{}', **kwargs):
+        """
+        Stream a module or model graph as Graphviz DOT, GraphML or CSV.
+
+        The graph is written while it is traversed, without building the
+        JSON graph first.
+
+        Args:
+            graph: "module", "reverse", "category", "category_reverse" or "model"
+            format: "dot", "graphml" or "csv"
+            ids: Comma-separated ir.module.module (or ir.model) ids to start from
+            category_prefixes: Comma-separated category prefixes (category graphs)
+            options: JSON object of graph options, as for the matching JSON endpoint
+        """
+        if format not in EXPORT_FORMATS or graph not in MODULE_EXPORT_GRAPHS + ('model',):
+            raise BadRequest("Unsupported graph export %r / %r" % (graph, format))
+        try:
+            record_ids = [int(record_id) for record_id in ids.split(',') if record_id.strip()]
+            options = json.loads(options or '{}')
+        except ValueError as e:
+            raise BadRequest(str(e))
+        if not isinstance(options, dict):
+            raise BadRequest("Graph export options must be a JSON object")
+
+        if graph == 'model':
+            events = request.env['ir.model'].sudo().browse(record_ids)._get_graph_export_events(
+                options.get('max_depth', 2),
+                options
+            )
+            node_keys, edge_keys = MODEL_NODE_KEYS, MODEL_EDGE_KEYS
+        else:
+            events = request.env['ir.module.module'].sudo()._get_graph_export_events(
+                graph,
+                record_ids,
+                [prefix.strip() for prefix in category_prefixes.split(',') if prefix.strip()],
+                options
+            )
+            node_keys, edge_keys = MODULE_NODE_KEYS, MODULE_EDGE_KEYS
+
+        mimetype, extension = EXPORT_FORMATS[format]
+        filename = "%s_graph.%s" % (graph, extension)
+        response = request.make_response(
+            export_graph(events, format, node_keys, edge_keys, name="%s_graph" % graph),
+            headers=[
+                ('Content-Type', '%s; charset=utf-8' % mimetype),
+                ('Content-Disposition', http.content_disposition(filename)),
+            ],
         )
-        return result
\ No newline at end of file
+        response.direct_passthrough = True
+        return response
@@ -1,5 +1,16 @@
 # -*- coding: utf-8 -*-
 from . import graph_builder
+from . import graph_compression
+from . import graph_export
+from . import graph_single_flight
+from . import graph_cache_entry
+from . import module_graph_index
+from . import module_cycle_index
+from . import graph_snapshot
 from . import module_category_helper
+from . import model_relation_index
+from . import ir_module_category
 from . import ir_module
+from . import ir_module_dependency
 from . import ir_model
+from . import ir_http
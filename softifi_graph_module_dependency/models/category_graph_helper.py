@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+import base64
+import binascii
+import hashlib
+import itertools
+import json
+import logging
+import threading
+from collections import Counter, OrderedDict, defaultdict
+
+from odoo import _
+from odoo.exceptions import UserError
+
+
+_logger = logging.getLogger(__name__)
+
+# Walks suspended at the end of a page, by (dbname, next cursor), so that the
+# next page resumes the traversal when it reaches the same worker
+SUSPENDED_WALKS_SIZE = 32
+_suspended_walks = OrderedDict()
+_suspended_walks_lock = threading.Lock()
+
+
+class CategoryGraphHelper:
+    """Helper class collapsing module graphs into category graphs.
+
+    Modules reached from a selection are grouped into one super-node per
+    category, and module-level edges between two categories are merged into
+    a single weighted edge. Only the collapsed graph is shipped to the
+    client, which can then expand one category at a time.
+    """
+
+    def __init__(self, env, index=None):
+        self.env = env
+        self.index = index or env['ir.module.module']._get_graph_index()
+        self.tree = env['ir.module.category']._get_graph_category_tree()
+
+    @staticmethod
+    def get_node_id(category_id):
+        """Get the graph node id of a category super-node."""
+        return 'category_%s' % category_id if category_id else 'category_none'
+
+    def build_quotient_graph(self, module_ids, options, reverse=False):
+        """Build the category graph of the modules reached from module_ids.
+
+        Args:
+            module_ids: Ids of the modules to start from
+            options: Dictionary of options controlling graph behavior
+                - max_depth: Maximum depth to traverse in the graph
+                - stop_domains: List of domains to stop traversal
+                - exclude_domains: List of domains to exclude modules
+                - include_relations: Whether to follow dependency edges
+                - include_exclusions: Whether to follow exclusion edges
+            reverse: If True, follow reverse dependencies
+
+        Returns:
+            dict: Dictionary with category 'nodes' and weighted 'edges'
+        """
+        depth_of, module_edges = self._traverse(module_ids, options, reverse)
+
+        members = defaultdict(list)
+        for module_id in depth_of:
+            members[self.index.category_id(module_id)].append(module_id)
+
+        internal_edges = Counter()
+        weights = Counter()
+        for from_id, to_id, edge_type in module_edges:
+            from_category = self.index.category_id(from_id)
+            to_category = self.index.category_id(to_id)
+            if from_category == to_category:
+                internal_edges[from_category] += 1
+            else:
+                weights[(self.get_node_id(from_category), self.get_node_id(to_category), edge_type)] += 1
+
+        nodes = [
+            dict(
+                self._create_category_node(category_id, category_members, depth_of),
+                internal_edges=internal_edges[category_id],
+            )
+            for category_id, category_members in members.items()
+        ]
+        edges = [
+            {"from": from_node, "to": to_node, "type": edge_type, "weight": weight}
+            for (from_node, to_node, edge_type), weight in weights.items()
+        ]
+        return {"nodes": nodes, "edges": edges}
+
+    def expand_category(self, module_ids, category_id, options, reverse=False):
+        """Expand one category super-node of a quotient graph into its modules.
+
+        Edges between two modules of the category are returned as is, edges
+        to other categories are merged into weighted edges towards their
+        super-nodes, so the result can replace the super-node client-side.
+
+        Args:
+            module_ids: Ids of the modules the quotient graph was built from
+            category_id: Id of the category to expand (False for uncategorized modules)
+            options: Same options as build_quotient_graph
+            reverse: If True, follow reverse dependencies
+
+        Returns:
+            dict: Dictionary with module 'nodes', 'edges' and the replaced 'category_node' id
+        """
+        category_id = category_id or False
+        depth_of, module_edges = self._traverse(module_ids, options, reverse)
+        members = {
+            module_id for module_id in depth_of
+            if self.index.category_id(module_id) == category_id
+        }
+
+        edges = []
+        weights = Counter()
+        for from_id, to_id, edge_type in module_edges:
+            from_inside, to_inside = from_id in members, to_id in members
+            if from_inside and to_inside:
+                edges.append({"from": from_id, "to": to_id, "type": edge_type})
+            elif from_inside:
+                weights[(from_id, self.get_node_id(self.index.category_id(to_id)), edge_type)] += 1
+            elif to_inside:
+                weights[(self.get_node_id(self.index.category_id(from_id)), to_id, edge_type)] += 1
+        edges.extend(
+            {"from": from_node, "to": to_node, "type": edge_type, "weight": weight}
+            for (from_node, to_node, edge_type), weight in weights.items()
+        )
+
+        return {
+            "category_node": self.get_node_id(category_id),
+            "nodes": [self.create_module_node(module_id, depth_of[module_id]) for module_id in sorted(members)],
+            "edges": edges,
+        }
+
+    def create_module_node(self, module_id, depth):
+        """Create a module node dictionary from the index, like _create_module_node."""
+        category_id = self.index.category_id(module_id)
+        node_data = {
+            "id": module_id,
+            "label": self.index.name(module_id),
+            "state": self.index.state(module_id),
+            "depth": depth,
+        }
+        if category_id:
+            node_data.update({
+                "category": self.tree.names.get(category_id, ''),
+                "category_id": category_id,
+            })
+        return node_data
+
+    def get_page(self, module_ids, options, reverse=False):
+        """Get one page of a module graph, in breadth-first order.
+
+        A page holds the next page_size nodes of the traversal and the edges
+        found up to the next node, so its edges only reference nodes of this
+        page or of previous ones. The opaque cursor stores how many nodes
+        were delivered. The walk is suspended in the worker at the end of a
+        page and resumed by the next one; a worker that does not hold it
+        replays the deterministic walk up to the cursor instead, which only
+        costs dictionary lookups on the cached index. Cursors expire when
+        the module graph generation changes.
+
+        Args:
+            module_ids: Ids of the modules to start from
+            options: Same options as build_quotient_graph, plus
+                - page_size: Maximum number of nodes of the page
+                - cursor: next_cursor of the previous page, none for the first page
+            reverse: If True, follow reverse dependencies
+
+        Returns:
+            dict: 'nodes' and 'edges' of the page, 'next_cursor' (None on the
+                  last page) and the 'offset' of the page's first node
+        """
+        try:
+            page_size = int(options["page_size"])
+        except (TypeError, ValueError):
+            page_size = 0
+        if page_size <= 0:
+            raise UserError(_("The page size of a graph must be a positive integer."))
+        module_ids = module_ids if isinstance(module_ids, list) else [module_ids]
+
+        generation = self.env['ir.module.module']._get_graph_generation()
+        signature = self._get_page_signature(module_ids, options, reverse)
+        offset = 0
+        suspended = None
+        if options.get("cursor"):
+            offset = self._decode_cursor(options["cursor"], generation, signature)
+            suspended = self._resume_walk(options["cursor"])
+        if suspended is None:
+            walk, pending, delivered = self._walk(module_ids, options, reverse), [], 0
+        else:
+            # The first node of this page was taken from the walk by the previous one
+            (event, walk), delivered = suspended, offset
+            pending = [event]
+
+        nodes, edges = [], []
+        next_cursor = None
+        for event in itertools.chain(pending, walk):
+            if event[0] == 'node':
+                if delivered == offset + page_size:
+                    next_cursor = self._encode_cursor(delivered, generation, signature)
+                    self._suspend_walk(next_cursor, event, walk)
+                    break
+                delivered += 1
+                if delivered > offset:
+                    nodes.append(self.create_module_node(event[1], event[2]))
+            elif delivered > offset:
+                # Edges following the last node of the previous page belong to it
+                edges.append({"from": event[1], "to": event[2], "type": event[3]})
+
+        self.env['ir.module.module']._get_graph_cycle_index(installed_only=False).annotate(nodes, edges)
+        return {"nodes": nodes, "edges": edges, "next_cursor": next_cursor, "offset": offset}
+
+    def _suspend_walk(self, cursor, event, walk):
+        """Keep a walk for the next page, with the event it stopped at.
+
+        The event and the walk are kept apart, so resuming never wraps the
+        walk and every page costs the same whatever its position.
+        """
+        with _suspended_walks_lock:
+            _suspended_walks[(self.env.cr.dbname, cursor)] = (event, walk)
+            while len(_suspended_walks) > SUSPENDED_WALKS_SIZE:
+                _suspended_walks.popitem(last=False)
+
+    def _resume_walk(self, cursor):
+        """Take the (event, walk) suspended for a cursor, None if this worker does not hold it."""
+        with _suspended_walks_lock:
+            return _suspended_walks.pop((self.env.cr.dbname, cursor), None)
+
+    @staticmethod
+    def _get_page_signature(module_ids, options, reverse):
+        """Hash of the request parameters, so a cursor only continues its own graph."""
+        params = {key: value for key, value in options.items() if key not in ('cursor', 'page_size')}
+        data = json.dumps([sorted(module_ids), bool(reverse), params], sort_keys=True, default=str)
+        return hashlib.sha1(data.encode()).hexdigest()[:16]
+
+    @staticmethod
+    def _encode_cursor(offset, generation, signature):
+        data = json.dumps({"o": offset, "g": generation, "s": signature}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor, generation, signature):
+        """Get the node offset stored in a cursor, checking it still applies."""
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            offset = int(data["o"])
+        except (AttributeError, binascii.Error, ValueError, TypeError, KeyError):
+            raise UserError(_("Invalid graph cursor."))
+        if data.get("s") != signature or offset < 0:
+            raise UserError(_("This graph cursor belongs to another graph request."))
+        if data.get("g") != generation:
+            raise UserError(_("The module graph changed since this cursor was issued, restart from the first page."))
+        return offset
+
+    def iter_export_events(self, module_ids, options, reverse=False):
+        """Walk the module graph for an export, without building the graph.
+
+        Everything needing the database (domains, cycles) is resolved before
+        returning, the returned generator only reads the in-memory index and
+        may therefore be consumed after the request cursor is closed.
+
+        Args:
+            module_ids: Ids of the modules to start from
+            options: Same options as build_quotient_graph
+            reverse: If True, follow reverse dependencies
+
+        Returns:
+            Generator of ('node', id, attrs) and ('edge', from_id, to_id, attrs) tuples
+        """
+        walk = self._walk(module_ids, options, reverse)
+        cycle_index = self.env['ir.module.module']._get_graph_cycle_index(installed_only=False)
+        return self._export_events(walk, cycle_index.cycle_of)
+
+    def _export_events(self, walk, cycle_of):
+        index, category_names = self.index, self.tree.complete_names
+        for event in walk:
+            if event[0] == 'node':
+                module_id, depth = event[1], event[2]
+                yield 'node', module_id, {
+                    "label": index.name(module_id),
+                    "state": index.state(module_id),
+                    "category": category_names.get(index.category_id(module_id), ''),
+                    "cycle_id": cycle_of.get(module_id),
+                    "depth": depth,
+                }
+            else:
+                yield 'edge', event[1], event[2], {"type": event[3]}
+
+    def _create_category_node(self, category_id, module_ids, depth_of):
+        """Create a super-node dictionary for a category."""
+        return {
+            "id": self.get_node_id(category_id),
+            "label": self.tree.complete_names.get(category_id) or _("Uncategorized"),
+            "type": "category",
+            "category_id": category_id,
+            "module_count": len(module_ids),
+            "states": dict(Counter(self.index.state(module_id) for module_id in module_ids)),
+            "depth": min(depth_of[module_id] for module_id in module_ids),
+        }
+
+    def _traverse(self, module_ids, options, reverse):
+        """Walk the module graph according to the graph options.
+
+        Returns:
+            Tuple (depth by module id, list of (from_id, to_id, type) edges)
+        """
+        depth_of, edges = {}, []
+        for event in self._walk(module_ids, options, reverse):
+            if event[0] == 'node':
+                depth_of[event[1]] = event[2]
+            else:
+                edges.append(event[1:])
+        return depth_of, edges
+
+    def _walk(self, module_ids, options, reverse):
+        """Get the index walk matching the graph options, see ModuleGraphIndex.walk.
+
+        Domains are evaluated immediately, the walk itself only reads the index.
+        """
+        max_depth = options.get("max_depth") or None
+        if options.get("max_depth", -1) == 0:
+            max_depth = 0
+        return self.index.walk(
+            module_ids,
+            reverse=reverse,
+            max_depth=max_depth,
+            include_relations=options.get("include_relations", True),
+            include_exclusions=options.get("include_exclusions", True),
+            stop_ids=self._search_domains(options.get("stop_domains")),
+            excluded_ids=self._search_domains(options.get("exclude_domains")),
+        )
+
+    def _search_domains(self, domains):
+        """Get ids of the modules matching any of the given domains.
+
+        Each domain is evaluated once over all modules instead of once per
+        visited module.
+        """
+        module_ids = set()
+        for domain in domains or []:
+            # Ensure domain is a list
+            if not isinstance(domain, list):
+                continue
+            try:
+                module_ids.update(self.env['ir.module.module'].search(domain).ids)
+            except Exception as e:
+                _logger.error(f"Error processing domain {domain}: {e}")
+        return module_ids
@@ -1,8 +1,17 @@
 from odoo import models, api
 import logging
+import time
 
 _logger = logging.getLogger(__name__)
 
+# Budgets applied when neither the request nor a system parameter sets them,
+# so that no traversal can hold a worker indefinitely (0 means unlimited)
+DEFAULT_GRAPH_BUDGET = {
+    "max_nodes": 5000,
+    "max_edges": 0,
+    "time_budget_ms": 10000,
+}
+
 
 class GraphBuilderMixin(models.AbstractModel):
     """Mixin providing common graph building functionality for both module and model graphs."""
@@ -30,6 +39,7 @@ class GraphBuilderMixin(models.AbstractModel):
         - Cycle detection
         - Depth tracking
         - Node/edge creation and deduplication
+        - Node/edge/time budgets (max_nodes, max_edges, time_budget_ms options)
         
         Args:
             record_ids: List of record IDs to start the graph from
@@ -43,9 +53,13 @@ class GraphBuilderMixin(models.AbstractModel):
             check_exclusion: Optional function to check if a record should be excluded
             
         Returns:
-            dict: Dictionary with 'nodes' and 'edges' lists representing the graph
+            dict: Dictionary with 'nodes' and 'edges' lists representing the graph.
+                  When a budget is set, 'truncated' tells whether it ran out and
+                  'frontier' lists the ids of the nodes left unexpanded.
         """
         options = dict(options or {})
+        if "budget" not in options:
+            options["budget"] = self._init_graph_budget(options)
         if "current_depth" not in options:
             options["current_depth"] = 0
         if "cycle_counter" not in options:
@@ -67,8 +81,18 @@ class GraphBuilderMixin(models.AbstractModel):
 
         records = self.browse(record_ids)
         nodes, edges = [], []
+        budget = options["budget"]
 
         for record in records:
+            # Start records must fit in the budget, children are reserved by their parent
+            if (
+                budget
+                and record.id not in budget["node_ids"]
+                and not self._consume_graph_budget(budget, node_ids=[record.id])
+            ):
+                budget["frontier"].add(record.id)
+                continue
+
             # Cycle detection
             if record.id in options["current_path"]:
                 cycle_start = options["current_path"].index(record.id)
@@ -89,6 +113,12 @@ class GraphBuilderMixin(models.AbstractModel):
                 options["current_path"].pop()
                 continue
 
+            # Leave the record unexpanded once the budget ran out
+            if budget and not self._consume_graph_budget(budget):
+                budget["frontier"].add(record.id)
+                options["current_path"].pop()
+                continue
+
             next_options = dict(options, current_depth=options["current_depth"] + 1)
 
             # Process relations
@@ -123,16 +153,22 @@ class GraphBuilderMixin(models.AbstractModel):
                     check_exclusion,
                 )
 
+            if budget and record.id not in budget["frontier"]:
+                budget["expanded"].add(record.id)
             options["current_path"].pop()
 
         # Final processing
-        if options["current_depth"] == 0 and options.get("cycles"):
-            self._mark_cycles_in_graph(nodes, edges, options["cycles"])
+        if options["current_depth"] == 0:
+            self._annotate_graph_cycles(nodes, edges, options["cycles"])
 
-        return {
+        result = {
             "nodes": list({n["id"]: n for n in nodes}.values()),
             "edges": list({f"{e['from']}-{e['to']}": e for e in edges}.values()),
         }
+        if options["current_depth"] == 0 and budget:
+            result["truncated"] = budget["exhausted"]
+            result["frontier"] = sorted(budget["frontier"] - budget["expanded"])
+        return result
 
     def _process_graph_relations(
         self,
@@ -150,9 +186,13 @@ class GraphBuilderMixin(models.AbstractModel):
     ):
         """Helper to process relations/exclusions for graph building."""
         relations = []
+        budget = next_options.get("budget")
         for rel in get_relations(record):
             if check_exclusion and check_exclusion(rel, next_options):
                 continue
+            if budget and not self._consume_graph_budget(budget, node_ids=[rel.id], edge_count=1):
+                budget["frontier"].add(record.id)
+                break
             relations.append(rel.id)
             edges.append(create_edge(record, rel))
 
@@ -172,6 +212,77 @@ class GraphBuilderMixin(models.AbstractModel):
             edges.extend(res["edges"])
         return relations
 
+    def _init_graph_budget(self, options):
+        """Initialize the traversal budget shared by all recursion levels.
+
+        Limits come from the max_nodes, max_edges and time_budget_ms options,
+        falling back to the softifi_graph_module_dependency.* system parameters,
+        then to DEFAULT_GRAPH_BUDGET. An explicit 0 disables a limit, empty
+        values (None, "") fall back like missing ones.
+
+        Returns:
+            dict: Budget state, or None if no limit applies
+        """
+        get_param = self.env["ir.config_parameter"].sudo().get_param
+        limits = {}
+        for key, default in DEFAULT_GRAPH_BUDGET.items():
+            value = options.get(key)
+            if value is None or value == "":
+                value = get_param("softifi_graph_module_dependency.%s" % key, default)
+            try:
+                limits[key] = int(value)
+            except (TypeError, ValueError):
+                _logger.warning("Ignoring invalid graph budget %s=%r, using %s", key, value, default)
+                limits[key] = default
+        if not any(limits.values()):
+            return None
+        return {
+            "max_nodes": limits["max_nodes"],
+            "max_edges": limits["max_edges"],
+            "deadline": time.monotonic() + limits["time_budget_ms"] / 1000.0 if limits["time_budget_ms"] else None,
+            "node_ids": set(),
+            "edge_count": 0,
+            "exhausted": False,
+            "frontier": set(),
+            "expanded": set(),
+        }
+
+    def _consume_graph_budget(self, budget, node_ids=(), edge_count=0):
+        """Reserve nodes and edges in the traversal budget.
+
+        Args:
+            budget: Budget state created by _init_graph_budget
+            node_ids: Ids of the nodes about to be added
+            edge_count: Number of edges about to be added
+
+        Returns:
+            Boolean indicating if the budget could afford them
+        """
+        if budget["exhausted"]:
+            return False
+        new_node_ids = [node_id for node_id in node_ids if node_id not in budget["node_ids"]]
+        if (
+            (budget["deadline"] and time.monotonic() > budget["deadline"])
+            or (budget["max_nodes"] and len(budget["node_ids"]) + len(new_node_ids) > budget["max_nodes"])
+            or (budget["max_edges"] and budget["edge_count"] + edge_count > budget["max_edges"])
+        ):
+            budget["exhausted"] = True
+            return False
+        budget["node_ids"].update(new_node_ids)
+        budget["edge_count"] += edge_count
+        return True
+
+    def _annotate_graph_cycles(self, nodes, edges, cycles):
+        """Mark the cycles of a built graph.
+
+        Args:
+            nodes: Node dictionaries of the graph
+            edges: Edge dictionaries of the graph
+            cycles: Cycles detected during the traversal, {cycle_id: set of ids}
+        """
+        if cycles:
+            self._mark_cycles_in_graph(nodes, edges, cycles)
+
     def _mark_cycles_in_graph(self, nodes, edges, cycles):
         """Mark all nodes and edges that are part of cycles."""
         # Process nodes
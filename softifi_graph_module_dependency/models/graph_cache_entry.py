@@ -0,0 +1,442 @@
+# -*- coding: utf-8 -*-
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import Counter
+
+import psycopg2
+
+from odoo import SUPERUSER_ID, models, fields, api
+from odoo.http import request
+from odoo.tools import date_utils
+
+from .graph_compression import compress_segment
+from .graph_single_flight import make_call_key, check_shared_access
+
+_logger = logging.getLogger(__name__)
+
+FINGERPRINT_PARAM = "softifi_graph_module_dependency.graph_cache_fingerprint"
+
+# Hit counts are buffered per process and written after this many hits or
+# seconds, whichever comes first
+HIT_FLUSH_SIZE = 100
+HIT_FLUSH_INTERVAL = 60.0
+
+
+class _HitBuffer:
+    """Hit counts of cache entries not written to the database yet."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._flushed_at = {}
+
+    def add(self, dbname, key):
+        with self._lock:
+            self._counts.setdefault(dbname, Counter())[key] += 1
+            self._flushed_at.setdefault(dbname, time.monotonic())
+
+    def pop(self, dbname, force=False):
+        """Take the counts of a database once they are due to be written.
+
+        Returns:
+            Counter of hits by entry key, empty if nothing is due
+        """
+        with self._lock:
+            counts = self._counts.get(dbname)
+            if not counts:
+                return Counter()
+            now = time.monotonic()
+            if not (force or sum(counts.values()) >= HIT_FLUSH_SIZE
+                    or now - self._flushed_at[dbname] >= HIT_FLUSH_INTERVAL):
+                return Counter()
+            self._flushed_at[dbname] = now
+            return self._counts.pop(dbname)
+
+
+graph_cache_hits = _HitBuffer()
+
+# First page requested by the module graph component with its default
+# settings, see buildGraphOptions and GRAPH_PAGE_SIZE in GraphModuleComponent.js
+UI_FIRST_PAGE_OPTIONS = {
+    "include_dependencies": True,
+    "include_exclusions": True,
+    "page_size": 200,
+    "cursor": None,
+}
+
+
+def graph_cached(method):
+    """Decorator serving a graph method from the graph.cache.entry table.
+
+    Every call bumps the hit counter of its entry, hits in batches (see
+    _count_hit). Misses are computed and
+    stored, so that the next identical call (from any worker) is a hit.
+    Payloads computed for an older generation of the module graph are
+    misses. Truncated results of budgeted traversals are never stored.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        call_key = make_call_key(self, method, args, kwargs)
+        if call_key is None:
+            return method(self, *args, **kwargs)
+
+        Entry = self.env["graph.cache.entry"].sudo()
+        key = Entry._get_cache_key(call_key)
+        if request and getattr(request, "graph_cache_key", None) is None:
+            # Lets ir.http reuse the compressed payload of the entry
+            request.graph_cache_key = key
+        generation = self.env["ir.module.module"]._get_graph_generation()
+        warm_up = self.env.context.get("graph_cache_warm_up")
+        if not warm_up:
+            payload = Entry._get_payload(key, generation)
+            if payload is not None:
+                check_shared_access(self)
+                Entry._count_hit(key)
+                return json.loads(payload)
+
+        result = method(self, *args, **kwargs)
+        payload = None
+        if not (isinstance(result, dict) and result.get("truncated")):
+            try:
+                # Serialized like JSON-RPC responses, see _get_compressed_parts
+                payload = json.dumps(result, ensure_ascii=False, default=date_utils.json_default)
+            except (TypeError, ValueError):
+                _logger.debug("Graph result of %s is not cacheable", method.__name__)
+        Entry._store_entry(key, call_key, payload, count_hit=not warm_up, generation=generation)
+        return result
+
+    return wrapper
+
+
+class GraphCacheEntry(models.Model):
+    """Persisted graph results shared by all workers, with request hit counters."""
+    _name = "graph.cache.entry"
+    _description = "Graph Cache Entry"
+    _order = "hit_count desc, id"
+
+    key = fields.Char(required=True, index=True, readonly=True)
+    model = fields.Char(required=True, readonly=True)
+    method = fields.Char(required=True, readonly=True)
+    arguments = fields.Text(readonly=True, help="JSON arguments of the cached call, by parameter name")
+    record_ids = fields.Char(readonly=True, help="JSON ids of the records the method was called on")
+    lang = fields.Char(readonly=True)
+    su = fields.Boolean(string="Superuser Mode", readonly=True)
+    payload = fields.Text(readonly=True)
+    payload_gzip = fields.Binary(attachment=False, readonly=True, help="Raw deflate segment of the payload")
+    payload_zstd = fields.Binary(attachment=False, readonly=True, help="zstd frame of the payload")
+    hit_count = fields.Integer(readonly=True)
+    generation = fields.Integer(readonly=True, help="Generation of the module graph the payload was computed for")
+    computed_at = fields.Datetime(readonly=True)
+
+    _sql_constraints = [
+        ("key_unique", "unique(key)", "A graph cache entry already exists for this key."),
+    ]
+
+    @api.model
+    def _get_cache_key(self, call_key):
+        """Hash a call key (without its database name) into an entry key."""
+        return hashlib.sha1(json.dumps(call_key[1:]).encode()).hexdigest()
+
+    @api.model
+    def _get_payload(self, key, generation):
+        """Get the cached JSON payload of a key for a graph generation, None on a miss."""
+        self.env.cr.execute(
+            "SELECT payload FROM graph_cache_entry WHERE key = %s AND generation = %s AND payload IS NOT NULL",
+            [key, generation],
+        )
+        row = self.env.cr.fetchone()
+        return row[0] if row else None
+
+    @api.model
+    def _store_entry(self, key, call_key, payload=None, count_hit=True, generation=0):
+        """Create or update an entry in its own short transaction.
+
+        Writing payloads from the request transaction would make concurrent
+        identical requests conflict on the same row, so they are written
+        through a separate cursor and conflicts are ignored.
+
+        The payload is only stored if its generation is the committed one: a
+        payload computed after an uncommitted bump (which may still be
+        rolled back) must not be served once that generation really exists.
+        """
+        _dbname, model, method, record_ids, arguments, lang, su = call_key
+        try:
+            with self.env.registry.cursor() as cr:
+                if payload is not None and \
+                        self.env["ir.module.module"]._get_committed_graph_generation(cr) != generation:
+                    payload = None
+                if payload is None and not count_hit:
+                    return
+                cr.execute(
+                    """
+                    INSERT INTO graph_cache_entry
+                        (key, model, method, arguments, record_ids, lang, su, payload, hit_count,
+                         generation, computed_at, create_date, write_date)
+                    VALUES (%(key)s, %(model)s, %(method)s, %(arguments)s, %(record_ids)s, %(lang)s, %(su)s,
+                            %(payload)s, %(hits)s, %(generation)s,
+                            CASE WHEN %(payload)s IS NULL THEN NULL ELSE now() AT TIME ZONE 'UTC' END,
+                            now() AT TIME ZONE 'UTC', now() AT TIME ZONE 'UTC')
+                    ON CONFLICT (key) DO UPDATE SET
+                        hit_count = graph_cache_entry.hit_count + EXCLUDED.hit_count,
+                        payload = COALESCE(EXCLUDED.payload, graph_cache_entry.payload),
+                        payload_gzip = CASE WHEN EXCLUDED.payload IS NULL THEN graph_cache_entry.payload_gzip END,
+                        payload_zstd = CASE WHEN EXCLUDED.payload IS NULL THEN graph_cache_entry.payload_zstd END,
+                        generation = CASE WHEN EXCLUDED.payload IS NULL THEN graph_cache_entry.generation
+                                          ELSE EXCLUDED.generation END,
+                        computed_at = COALESCE(EXCLUDED.computed_at, graph_cache_entry.computed_at),
+                        write_date = EXCLUDED.write_date
+                    """,
+                    {
+                        "key": key,
+                        "model": model,
+                        "method": method,
+                        "arguments": arguments,
+                        "record_ids": json.dumps(list(record_ids)),
+                        "lang": lang,
+                        "su": su,
+                        "payload": payload,
+                        "hits": 1 if count_hit else 0,
+                        "generation": generation,
+                    },
+                )
+        except psycopg2.Error as e:
+            _logger.debug("Could not update graph cache entry %s: %s", key, e)
+
+    @api.model
+    def _count_hit(self, key):
+        """Count a cache hit without writing to the database on the fast path.
+
+        Hits are buffered in the process and written in one statement by the
+        request reaching HIT_FLUSH_SIZE hits or HIT_FLUSH_INTERVAL seconds.
+        """
+        graph_cache_hits.add(self.env.cr.dbname, key)
+        self._flush_hit_counts()
+
+    @api.model
+    def _flush_hit_counts(self, force=False):
+        """Write the buffered hit counts of the process that are due.
+
+        Args:
+            force: Write them all, e.g. before the counters are used
+        """
+        counts = graph_cache_hits.pop(self.env.cr.dbname, force)
+        if not counts:
+            return
+        try:
+            with self.env.registry.cursor() as cr:
+                cr.execute(
+                    """
+                    UPDATE graph_cache_entry e
+                       SET hit_count = e.hit_count + v.hits
+                      FROM unnest(%s::varchar[], %s::int[]) AS v(key, hits)
+                     WHERE e.key = v.key
+                    """,
+                    [list(counts), list(counts.values())],
+                )
+        except psycopg2.Error as e:
+            _logger.debug("Could not update graph cache hit counts: %s", e)
+
+    @api.model
+    def _get_compressed_parts(self, key, body, encoding, level):
+        """Split a JSON-RPC response body around the cached payload of an entry.
+
+        The payload segment is compressed once and stored with the entry, so
+        repeated hits only compress the few bytes of the JSON-RPC envelope.
+
+        Args:
+            key: Key of the entry that served the response
+            body: Uncompressed response body
+            encoding: 'gzip' or 'zstd'
+            level: Compression level
+
+        Returns:
+            List of (raw bytes, compressed segment or None) parts for
+            assemble_body, or None if the body does not embed the payload
+        """
+        column = "payload_%s" % encoding
+        if column not in self._fields:
+            return None
+        self.env.cr.execute(
+            "SELECT payload, {}, computed_at FROM graph_cache_entry WHERE key = %s".format(column),
+            [key],
+        )
+        row = self.env.cr.fetchone()
+        if not row or row[0] is None:
+            return None
+        payload, compressed, computed_at = row[0].encode(), row[1], row[2]
+
+        # JSON-RPC bodies are {"jsonrpc": "2.0", "id": ..., "result": <payload>}
+        start = len(body) - len(payload) - 1
+        if start <= 0 or body[-1:] != b"}" or memoryview(body)[start:-1] != payload:
+            return None
+
+        if compressed is None:
+            compressed = compress_segment(payload, encoding, level)
+            try:
+                with self.env.registry.cursor() as cr:
+                    cr.execute(
+                        "UPDATE graph_cache_entry SET {} = %s WHERE key = %s AND computed_at = %s".format(column),
+                        [compressed, key, computed_at],
+                    )
+            except psycopg2.Error as e:
+                _logger.debug("Could not store compressed graph cache entry %s: %s", key, e)
+        return [(body[:start], None), (payload, bytes(compressed)), (body[-1:], None)]
+
+    @api.model
+    def _invalidate_graph_cache(self):
+        """Drop all cached payloads, keeping hit counters."""
+        self.env.cr.execute("""
+            UPDATE graph_cache_entry
+               SET payload = NULL, payload_gzip = NULL, payload_zstd = NULL, computed_at = NULL
+        """)
+        self.env.invalidate_all()
+
+    @api.model
+    def _get_module_graph_fingerprint(self):
+        """Hash of module states, versions and dependencies of the database."""
+        self.env.cr.execute("""
+            SELECT md5(
+                COALESCE((SELECT string_agg(name || ':' || state || ':' || COALESCE(latest_version, ''), ',' ORDER BY name)
+                            FROM ir_module_module), '')
+                || '|' ||
+                COALESCE((SELECT string_agg(module_id || ':' || name, ',' ORDER BY module_id, name)
+                            FROM ir_module_module_dependency), '')
+            )
+        """)
+        return self.env.cr.fetchone()[0]
+
+    def _register_hook(self):
+        """Post-upgrade hook: drop stale graphs and schedule the warm-up.
+
+        Runs whenever a registry is loaded. Cached graphs are only dropped
+        when the module graph changed since they were computed, e.g. after
+        an upgrade, install or uninstall.
+        """
+        super()._register_hook()
+        fingerprint = self._get_module_graph_fingerprint()
+        ICP = self.env["ir.config_parameter"].sudo()
+        if ICP.get_param(FINGERPRINT_PARAM) == fingerprint:
+            return
+        _logger.info("Module graph changed, invalidating the graph cache")
+        self._invalidate_graph_cache()
+        # Covers changes made without the ORM, e.g. by another server version
+        self.env["ir.module.module"]._bump_graph_generation()
+        ICP.set_param(FINGERPRINT_PARAM, fingerprint)
+        cron = self.env.ref(
+            "softifi_graph_module_dependency.ir_cron_graph_cache_warm_up",
+            raise_if_not_found=False,
+        )
+        if cron:
+            cron._trigger()
+
+    @api.model
+    def _purge_graph_cache(self):
+        """Keep the most requested entries only.
+
+        Every distinct call (e.g. each page cursor) adds an entry, so the
+        least requested entries beyond the
+        softifi_graph_module_dependency.max_graph_cache_entries system
+        parameter (default 5000) are deleted. Payloads are only kept for the
+        softifi_graph_module_dependency.max_cached_graphs most requested
+        ones (default 500).
+        """
+        ICP = self.env["ir.config_parameter"].sudo()
+        limit = int(ICP.get_param("softifi_graph_module_dependency.max_cached_graphs", 500))
+        max_entries = int(ICP.get_param("softifi_graph_module_dependency.max_graph_cache_entries", 5000))
+        self.env.cr.execute("""
+            DELETE FROM graph_cache_entry
+             WHERE id NOT IN (SELECT id FROM graph_cache_entry ORDER BY hit_count DESC, id LIMIT %s)
+        """, [max(max_entries, limit)])
+        self.env.cr.execute("""
+            UPDATE graph_cache_entry SET payload = NULL, payload_gzip = NULL, payload_zstd = NULL, computed_at = NULL
+             WHERE payload IS NOT NULL
+               AND id NOT IN (SELECT id FROM graph_cache_entry ORDER BY hit_count DESC, id LIMIT %s)
+        """, [limit])
+        self.env.invalidate_all()
+
+    @api.model
+    def _get_most_requested_module_ids(self, limit):
+        """Get ids of the modules requested most through forward/reverse graphs."""
+        entries = self.search_read(
+            [
+                ("model", "=", "ir.module.module"),
+                ("method", "in", ["get_module_graph", "get_reverse_dependency_graph"]),
+                ("hit_count", ">", 0),
+            ],
+            ["arguments", "hit_count"],
+        )
+        hits = Counter()
+        for entry in entries:
+            try:
+                module_ids = json.loads(entry["arguments"]).get("module_ids") or []
+            except (TypeError, ValueError, IndexError, AttributeError):
+                continue
+            for module_id in module_ids if isinstance(module_ids, list) else [module_ids]:
+                hits[module_id] += entry["hit_count"]
+        return [module_id for module_id, _count in hits.most_common(limit)]
+
+    @api.model
+    def _get_warm_up_user(self):
+        """Get the user warming up the graphs requested by the graph component.
+
+        The component calls as the logged-in administrator, outside of
+        superuser mode, which the cron user (uid 1) cannot reproduce.
+
+        Returns:
+            res.users record of an administrator, empty if there is none
+        """
+        group = self.env.ref("base.group_system", raise_if_not_found=False)
+        if not group:
+            return self.env["res.users"]
+        return group.sudo().users.filtered(lambda user: user.id != SUPERUSER_ID).sorted("id")[:1]
+
+    @api.model
+    def _cron_warm_up_graph_cache(self):
+        """Precompute the most requested graphs.
+
+        Computes the graph of every top-level module category, the graph of
+        all installed modules, and the forward/reverse closures of the most
+        requested modules (softifi_graph_module_dependency.warm_up_top_modules
+        system parameter, default 20), for every installed language.
+
+        Calls are made in the shapes of real requests, which are part of the
+        cache key: the API controllers call in superuser mode with the
+        options of the client (warmed with the default, empty options), the
+        graph component calls as an administrator, without superuser mode,
+        for the first page.
+        """
+        self._flush_hit_counts(force=True)
+        self._purge_graph_cache()
+        top_modules = int(self.env["ir.config_parameter"].sudo().get_param(
+            "softifi_graph_module_dependency.warm_up_top_modules", 20
+        ))
+        module_ids = self._get_most_requested_module_ids(top_modules)
+        module_ids = self.env["ir.module.module"].browse(module_ids).exists().ids
+        user = self._get_warm_up_user()
+
+        for lang, _name in self.env["res.lang"].get_installed():
+            Module = self.env["ir.module.module"].with_context(lang=lang, graph_cache_warm_up=True).sudo()
+            tree = self.env["ir.module.category"].with_context(lang=lang)._get_graph_category_tree()
+            top_categories = sorted(
+                name for category_id, name in tree.names.items() if not tree.parents[category_id]
+            )
+            for name in top_categories:
+                Module.get_category_module_graph([name], {})
+            Module.get_installation_graph({})
+            for module_id in module_ids:
+                Module.get_module_graph([module_id], {})
+                Module.get_reverse_dependency_graph([module_id], {})
+            if user:
+                # An environment of uid 1 is always in superuser mode
+                UserModule = Module.with_user(user)
+                for module_id in module_ids:
+                    UserModule.get_module_graph([module_id], options=dict(UI_FIRST_PAGE_OPTIONS))
+                    UserModule.get_reverse_dependency_graph([module_id], options=dict(UI_FIRST_PAGE_OPTIONS))
+            _logger.info(
+                "Warmed up graph cache (%s): %s categories, %s modules",
+                lang, len(top_categories), len(module_ids)
+            )
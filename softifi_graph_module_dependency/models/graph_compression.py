@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import logging
+import struct
+import zlib
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    zstd = None
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_LEVEL = 6
+DEFAULT_MIN_SIZE = 16384
+
+# gzip member header: deflate, no flags, no mtime, unknown OS
+GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+
+
+def get_supported_encodings():
+    """Content encodings this server can produce, by preference."""
+    return ("zstd", "gzip") if zstd is not None else ("gzip",)
+
+
+def choose_encoding(accept_encodings):
+    """Pick the preferred content encoding accepted by the client.
+
+    Args:
+        accept_encodings: werkzeug Accept object of the Accept-Encoding header
+
+    Returns:
+        'zstd', 'gzip' or None
+    """
+    for encoding in get_supported_encodings():
+        if accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def compress_segment(data, encoding, level=DEFAULT_LEVEL, final=False):
+    """Compress a part of a body so that parts can be concatenated.
+
+    gzip parts are raw deflate streams ending on a full flush (or on the
+    final block), zstd parts are complete frames.
+    """
+    if encoding == "zstd":
+        return zstd.compress(data, level=level)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_FULL_FLUSH)
+
+
+def compress_body(body, encoding, level=DEFAULT_LEVEL):
+    """Compress a whole body."""
+    return assemble_body([(body, None)], encoding, level)
+
+
+def assemble_body(parts, encoding, level=DEFAULT_LEVEL):
+    """Build a compressed body from parts, reusing precompressed ones.
+
+    Args:
+        parts: List of (raw bytes, compressed segment or None) tuples, the
+               compressed segments must come from compress_segment(final=False)
+        encoding: 'gzip' or 'zstd'
+        level: Compression level of the parts compressed here
+
+    Returns:
+        bytes: Compressed body decoding to the concatenation of the raw parts
+    """
+    chunks = []
+    crc, size = 0, 0
+    last = len(parts) - 1
+    for position, (raw, compressed) in enumerate(parts):
+        if encoding == "gzip":
+            crc = zlib.crc32(raw, crc)
+            size += len(raw)
+            if position == last:
+                # The final deflate block must close the stream
+                compressed = compress_segment(raw, encoding, level, final=True)
+        if compressed is None:
+            compressed = compress_segment(raw, encoding, level)
+        chunks.append(compressed)
+
+    if encoding == "gzip":
+        return GZIP_HEADER + b"".join(chunks) + struct.pack("<II", crc & 0xFFFFFFFF, size & 0xFFFFFFFF)
+    return b"".join(chunks)
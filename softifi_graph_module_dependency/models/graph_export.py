@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+from xml.sax.saxutils import quoteattr, escape
+
+EXPORT_FORMATS = {
+    # format: (mimetype, file extension)
+    "dot": ("text/vnd.graphviz", "dot"),
+    "graphml": ("application/graphml+xml", "graphml"),
+    "csv": ("text/csv", "csv"),
+}
+
+MODULE_NODE_KEYS = ("label", "state", "category", "cycle_id", "depth")
+MODULE_EDGE_KEYS = ("type",)
+MODEL_NODE_KEYS = ("label", "model", "cycle_id", "depth")
+MODEL_EDGE_KEYS = ("field", "type")
+
+
+def export_graph(events, export_format, node_keys, edge_keys, name="graph"):
+    """Serialize graph events in an exchange format, chunk by chunk.
+
+    Args:
+        events: Iterable of ('node', id, attrs) and ('edge', from_id, to_id, attrs)
+                tuples, as produced by the traversal
+        export_format: One of EXPORT_FORMATS
+        node_keys: Names of the node attributes, in output order
+        edge_keys: Names of the edge attributes, in output order
+        name: Name of the graph
+
+    Returns:
+        Generator of encoded chunks, suitable as a streamed response body
+    """
+    writer = {
+        "dot": _export_dot,
+        "graphml": _export_graphml,
+        "csv": _export_csv,
+    }[export_format]
+    return (chunk.encode() for chunk in writer(events, node_keys, edge_keys, name))
+
+
+def _has_value(value):
+    # depth 0 is a value, unlike False/None (0 == False)
+    return value is not None and value is not False and value != ""
+
+
+def _dot_quote(value):
+    return '"%s"' % str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _dot_attrs(attrs, keys):
+    return ", ".join(
+        "%s=%s" % (key, _dot_quote(attrs[key]))
+        for key in keys
+        if _has_value(attrs.get(key))
+    )
+
+
+def _export_dot(events, node_keys, edge_keys, name):
+    yield "digraph %s {\n  node [shape=box];\n" % _dot_quote(name)
+    for event in events:
+        if event[0] == "node":
+            _kind, node_id, attrs = event
+            yield "  %s [%s];\n" % (_dot_quote(node_id), _dot_attrs(attrs, node_keys))
+        else:
+            _kind, from_id, to_id, attrs = event
+            yield "  %s -> %s [%s];\n" % (_dot_quote(from_id), _dot_quote(to_id), _dot_attrs(attrs, edge_keys))
+    yield "}\n"
+
+
+def _graphml_data(attrs, keys, prefix):
+    return "".join(
+        '<data key="%s_%s">%s</data>' % (prefix, key, escape(str(attrs[key])))
+        for key in keys
+        if _has_value(attrs.get(key))
+    )
+
+
+def _export_graphml(events, node_keys, edge_keys, name):
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+    )
+    for prefix, domain, keys in (("n", "node", node_keys), ("e", "edge", edge_keys)):
+        for key in keys:
+            attr_type = "int" if key in ("depth", "cycle_id", "weight") else "string"
+            yield '  <key id="%s_%s" for="%s" attr.name="%s" attr.type="%s"/>\n' % (
+                prefix, key, domain, key, attr_type
+            )
+    yield '  <graph id=%s edgedefault="directed">\n' % quoteattr(name)
+    edge_count = 0
+    for event in events:
+        if event[0] == "node":
+            _kind, node_id, attrs = event
+            yield '    <node id=%s>%s</node>\n' % (quoteattr(str(node_id)), _graphml_data(attrs, node_keys, "n"))
+        else:
+            _kind, from_id, to_id, attrs = event
+            edge_count += 1
+            yield '    <edge id="e%s" source=%s target=%s>%s</edge>\n' % (
+                edge_count, quoteattr(str(from_id)), quoteattr(str(to_id)), _graphml_data(attrs, edge_keys, "e")
+            )
+    yield "  </graph>\n</graphml>\n"
+
+
+def _export_csv(events, node_keys, edge_keys, name):
+    """One table for nodes and edges, told apart by the 'kind' column."""
+    columns = ["kind", "id", "from", "to"] + list(node_keys) + [key for key in edge_keys if key not in node_keys]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writeheader()
+    yield flush()
+    for event in events:
+        if event[0] == "node":
+            _kind, node_id, attrs = event
+            writer.writerow(dict(attrs, kind="node", id=node_id))
+        else:
+            _kind, from_id, to_id, attrs = event
+            writer.writerow(dict(attrs, kind="edge", **{"from": from_id, "to": to_id}))
+        yield flush()
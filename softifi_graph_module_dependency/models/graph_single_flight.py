@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+import copy
+import functools
+import inspect
+import json
+import logging
+import threading
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 30.0
+
+
+class _InFlightCall:
+    """A computation other threads can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+class SingleFlight:
+    """Coalesce concurrent identical computations inside the process.
+
+    The first caller of a key computes the result, callers arriving while
+    it runs wait for it and share its result. Waiters fall back to their own
+    computation when the leader fails or takes longer than the timeout.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, compute, timeout=DEFAULT_TIMEOUT):
+        """Run compute() once for all concurrent callers of the same key.
+
+        Args:
+            key: Hashable key identifying identical computations
+            compute: Function without arguments producing the result
+            timeout: Seconds to wait for an in-flight computation
+
+        Returns:
+            The result of compute(), deep-copied for waiting callers
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _InFlightCall()
+
+        if leader:
+            try:
+                call.result = compute()
+            except Exception:
+                call.failed = True
+                raise
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+            return call.result
+
+        if call.done.wait(timeout) and not call.failed:
+            return copy.deepcopy(call.result)
+        _logger.debug("Single-flight wait on %s timed out or failed, computing independently", key[:3])
+        return compute()
+
+
+graph_single_flight = SingleFlight()
+
+
+def _canonical(value):
+    """Normalize an argument so that equivalent requests share a key."""
+    if isinstance(value, (set, frozenset)):
+        value = list(value)
+    if isinstance(value, (list, tuple)) and all(isinstance(item, int) and not isinstance(item, bool) for item in value):
+        return sorted(set(value))
+    return value
+
+
+@functools.lru_cache(maxsize=None)
+def _get_signature(method):
+    return inspect.signature(method)
+
+
+def make_call_key(record, method, args, kwargs):
+    """Build the key identifying equivalent calls of a graph method.
+
+    Calls are equivalent when they target the same database and model, with
+    the same record ids, normalized id arguments, canonical options,
+    language and superuser mode. Arguments are bound to their parameter
+    names first, so positional and keyword calls share a key.
+
+    Results only depend on the access rights of the caller through model
+    access, which is checked before a shared result is returned (see
+    check_shared_access), so the user is not part of the key.
+
+    Returns:
+        Tuple (dbname, model, method, ids, arguments json, lang, su), or
+        None if the arguments cannot be bound or serialized
+    """
+    try:
+        bound = _get_signature(method).bind(record, *args, **kwargs)
+    except TypeError:
+        return None
+    bound.apply_defaults()
+    arguments = dict(bound.arguments)
+    arguments.pop(next(iter(_get_signature(method).parameters)))
+    try:
+        arguments = json.dumps(
+            {name: _canonical(value) for name, value in arguments.items()},
+            sort_keys=True,
+            default=str,
+        )
+    except (TypeError, ValueError):
+        return None
+    return (
+        record.env.cr.dbname,
+        record._name,
+        method.__name__,
+        tuple(sorted(record.ids)),
+        arguments,
+        record.env.lang,
+        record.env.su,
+    )
+
+
+def check_shared_access(record):
+    """Check that a caller may read a result computed by another caller.
+
+    Cached and coalesced results skip the computation, and with it the
+    access checks it would have made.
+    """
+    if not record.env.su:
+        record.check_access_rights("read")
+
+
+def single_flight(method):
+    """Decorator coalescing identical concurrent calls of a graph method."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = make_call_key(self, method, args, kwargs)
+        if key is None:
+            # Arguments that cannot be serialized are never coalesced
+            return method(self, *args, **kwargs)
+
+        timeout = self.env["ir.config_parameter"].sudo().get_param(
+            "softifi_graph_module_dependency.single_flight_timeout"
+        )
+        try:
+            timeout = float(timeout) if timeout else DEFAULT_TIMEOUT
+        except ValueError:
+            timeout = DEFAULT_TIMEOUT
+        check_shared_access(self)
+        return graph_single_flight.do(key, lambda: method(self, *args, **kwargs), timeout)
+
+    return wrapper
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import logging
+from collections import defaultdict
+
+from odoo import _, fields, release
+from odoo.exceptions import UserError
+
+from .module_graph_index import ModuleGraphIndex, strongly_connected_components
+
+_logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = "softifi.module_graph_snapshot"
+SNAPSHOT_VERSION = 1
+
+
+class GraphSnapshotHelper:
+    """Helper class exporting module graph snapshots and comparing them.
+
+    Snapshots identify modules by technical name so that graphs coming from
+    different databases (where ids differ) can be compared directly.
+    """
+
+    def __init__(self, env):
+        self.env = env
+
+    def export_snapshot(self):
+        """Export the full module graph of the current database.
+
+        Returns:
+            dict: Versioned snapshot with 'modules' keyed by name and 'edges'
+                  as [from_name, to_name, type] triples
+        """
+        index = ModuleGraphIndex.load(self.env)
+        category_ids = {vals['category_id'] for vals in index.modules.values() if vals['category_id']}
+        category_names = {
+            category.id: category.name
+            for category in self.env['ir.module.category'].browse(category_ids)
+        }
+
+        modules = {}
+        for vals in index.modules.values():
+            modules[vals['name']] = {
+                'state': vals['state'],
+                'category': category_names.get(vals['category_id'], False),
+                'version': vals['version'],
+            }
+        edges = sorted(
+            [index.name(from_id), index.name(to_id), edge_type]
+            for from_id, to_id, edge_type in index.edges()
+        )
+
+        return {
+            'format': SNAPSHOT_FORMAT,
+            'version': SNAPSHOT_VERSION,
+            'database': self.env.cr.dbname,
+            'server_version': release.version,
+            'created_at': fields.Datetime.to_string(fields.Datetime.now()),
+            'modules': modules,
+            'edges': edges,
+        }
+
+    @classmethod
+    def diff_snapshots(cls, snapshot_a, snapshot_b):
+        """Compare two snapshots by module name.
+
+        Modules and edges are compared through sets and dictionaries, so the
+        diff is linear in the size of both snapshots.
+
+        Args:
+            snapshot_a: Reference snapshot (e.g. the database before migration)
+            snapshot_b: Snapshot to compare against the reference
+
+        Returns:
+            dict: Added/removed modules, added/removed edges, state changes
+                  and the dependency cycles that only exist in snapshot_b
+        """
+        cls._check_snapshot(snapshot_a)
+        cls._check_snapshot(snapshot_b)
+
+        modules_a, modules_b = snapshot_a['modules'], snapshot_b['modules']
+        edges_a = {tuple(edge) for edge in snapshot_a['edges']}
+        edges_b = {tuple(edge) for edge in snapshot_b['edges']}
+
+        state_changes = [
+            {
+                'module': name,
+                'from': modules_a[name]['state'],
+                'to': vals['state'],
+            }
+            for name, vals in sorted(modules_b.items())
+            if name in modules_a and modules_a[name]['state'] != vals['state']
+        ]
+
+        cycles_a = {frozenset(cycle) for cycle in cls._find_cycles(edges_a)}
+        new_cycles = [
+            sorted(cycle)
+            for cycle in cls._find_cycles(edges_b)
+            if frozenset(cycle) not in cycles_a
+        ]
+
+        return {
+            'from': cls._describe_snapshot(snapshot_a),
+            'to': cls._describe_snapshot(snapshot_b),
+            'added_modules': sorted(modules_b.keys() - modules_a.keys()),
+            'removed_modules': sorted(modules_a.keys() - modules_b.keys()),
+            'added_edges': [list(edge) for edge in sorted(edges_b - edges_a)],
+            'removed_edges': [list(edge) for edge in sorted(edges_a - edges_b)],
+            'state_changes': state_changes,
+            'new_cycles': sorted(new_cycles),
+        }
+
+    @staticmethod
+    def _check_snapshot(snapshot):
+        """Reject payloads that are not well-formed snapshots of a supported version."""
+        if not isinstance(snapshot, dict) or snapshot.get('format') != SNAPSHOT_FORMAT:
+            raise UserError(_("Invalid module graph snapshot."))
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            raise UserError(_(
+                "Unsupported module graph snapshot version %(version)s (expected %(expected)s).",
+                version=snapshot.get('version'),
+                expected=SNAPSHOT_VERSION,
+            ))
+        modules = snapshot.get('modules')
+        if not isinstance(modules, dict) or not all(
+            isinstance(name, str) and isinstance(vals, dict) and 'state' in vals
+            for name, vals in modules.items()
+        ):
+            raise UserError(_("Invalid module graph snapshot: 'modules' must map module names to objects with a state."))
+        edges = snapshot.get('edges')
+        if not isinstance(edges, list) or not all(
+            isinstance(edge, list) and len(edge) == 3 and all(isinstance(item, str) for item in edge)
+            for edge in edges
+        ):
+            raise UserError(_("Invalid module graph snapshot: 'edges' must be [from, to, type] lists of names."))
+
+    @staticmethod
+    def _describe_snapshot(snapshot):
+        return {
+            'database': snapshot.get('database'),
+            'server_version': snapshot.get('server_version'),
+            'created_at': snapshot.get('created_at'),
+        }
+
+    @staticmethod
+    def _find_cycles(edges):
+        """Find dependency cycles among snapshot edges."""
+        adjacency = defaultdict(list)
+        for from_name, to_name, edge_type in edges:
+            if edge_type == 'dependency':
+                adjacency[from_name].append(to_name)
+        return strongly_connected_components(
+            list(adjacency), lambda name: adjacency.get(name, [])
+        )
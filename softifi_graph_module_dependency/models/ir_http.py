@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import models
+from odoo.http import request
+
+from .graph_compression import DEFAULT_LEVEL, DEFAULT_MIN_SIZE, assemble_body, choose_encoding, compress_body
+
+_logger = logging.getLogger(__name__)
+
+GRAPH_ROUTE_PREFIXES = ('/api/graph/', '/graph_module_dependency/')
+
+
+class IrHttp(models.AbstractModel):
+    _inherit = 'ir.http'
+
+    @classmethod
+    def _post_dispatch(cls, response):
+        super()._post_dispatch(response)
+        cls._compress_graph_response(response)
+
+    @classmethod
+    def _compress_graph_response(cls, response):
+        """Compress large graph responses according to Accept-Encoding.
+
+        Applies to the graph routes and to any request served by a cached
+        graph method. Bodies smaller than the
+        softifi_graph_module_dependency.compression_min_size system parameter
+        (bytes, default 16384) are left as is, the level comes from
+        softifi_graph_module_dependency.compression_level (default 6).
+        """
+        cache_key = getattr(request, 'graph_cache_key', None)
+        if not cache_key and not request.httprequest.path.startswith(GRAPH_ROUTE_PREFIXES):
+            return
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+        ):
+            return
+        encoding = choose_encoding(request.httprequest.accept_encodings)
+        if not encoding:
+            return
+
+        get_param = request.env['ir.config_parameter'].sudo().get_param
+        try:
+            min_size = int(get_param('softifi_graph_module_dependency.compression_min_size', DEFAULT_MIN_SIZE))
+            level = int(get_param('softifi_graph_module_dependency.compression_level', DEFAULT_LEVEL))
+        except ValueError:
+            min_size, level = DEFAULT_MIN_SIZE, DEFAULT_LEVEL
+
+        body = response.get_data()
+        if len(body) < min_size:
+            return
+
+        parts = None
+        if cache_key:
+            parts = request.env['graph.cache.entry'].sudo()._get_compressed_parts(cache_key, body, encoding, level)
+        compressed = assemble_body(parts, encoding, level) if parts else compress_body(body, encoding, level)
+        _logger.debug("Compressed graph response with %s: %s -> %s bytes", encoding, len(body), len(compressed))
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
@@ -1,13 +1,44 @@
-from odoo import models, api
+from collections import defaultdict
+
+from odoo import _, models, api, tools
+from odoo.exceptions import UserError
 from .graph_builder import GraphBuilderMixin
+from .model_relation_index import ModelRelationIndex, RELATIONAL_TTYPES
+from .graph_single_flight import single_flight
+from .graph_cache_entry import graph_cached
+from .module_graph_index import number_cycles, strongly_connected_components
+
+
+def _as_list(value):
+    """Accept a single technical name where a list of names is expected."""
+    return [value] if isinstance(value, str) else list(value or ())
+
+
+def _as_ttypes(value):
+    """Get the relational field types of the ttypes option, a single type is accepted.
+
+    Raises:
+        UserError: If a type is not a relational field type
+    """
+    ttypes = _as_list(value)
+    invalid = [ttype for ttype in ttypes if ttype not in RELATIONAL_TTYPES]
+    if invalid:
+        raise UserError(_(
+            "Invalid relational field types %(ttypes)s, expected some of %(expected)s",
+            ttypes=", ".join(map(str, invalid)),
+            expected=", ".join(RELATIONAL_TTYPES),
+        ))
+    return tuple(ttypes or RELATIONAL_TTYPES)
 
 
 class IrModel(models.Model):
     _name = 'ir.model'
     _inherit = ["ir.model", "graph.builder.mixin"]
 
+    @graph_cached
+    @single_flight
     def get_model_relation_graph(
-        self, max_depth=2, current_depth=0, visited_models=None
+        self, max_depth=2, current_depth=0, visited_models=None, options=None
     ):
         """
         Generate a graph representation of model relations based on foreign keys.
@@ -17,56 +48,354 @@ class IrModel(models.Model):
             max_depth (int): Maximum recursion depth to prevent infinite loops
             current_depth (int): Current recursion depth (used internally)
             visited_models (set): Set of already visited model IDs to prevent cycles
+            options (dict): Optional dictionary of graph options
+                - direction: "forward" (default) follows the relational fields of
+                  the models, "reverse" finds the models referencing them
+                - ttypes: Relational field types to follow
+                - exclude_models: Technical names of (hub) models not to follow,
+                  e.g. ['mail.message', 'res.users']
+                - exclude_transient: Skip transient models
+                - exclude_abstract: Skip abstract models in reverse mode
+                - modules: Only reach models defined or extended by these modules
 
         Returns:
             dict: Dictionary with 'nodes' and 'edges' lists representing the graph
         """
-        # Initialize options dictionary for graph builder
-        options = {
-            "max_depth": max_depth,
-            "current_depth": current_depth,
-            "all_visited": visited_models or set(),
-        }
-        
-        # Use the shared graph builder core
-        return self._build_graph_core(
-            record_ids=self.ids,
-            options=options,
-            get_relations=self._get_model_relations,
-            get_exclusions=None,  # No exclusions for model relations
-            create_node=self._create_model_node,
-            create_relation_edge=self._create_model_relation_edge,
-            create_exclusion_edge=None,  # No exclusions for model relations
+        options = options or {}
+        if options.get("direction") == "reverse":
+            get_level_edges = self._get_reverse_level_edges
+        else:
+            get_level_edges = self._get_forward_level_edges
+        return self._build_model_graph_by_levels(
+            max_depth, current_depth, visited_models, options, get_level_edges
         )
-    
-    def _get_model_relations(self, model):
-        """Get related models through relational fields."""
-        related_models = []
-        
-        # Get all fields of this model that are relational
-        relational_fields = self.env["ir.model.fields"].search(
-            [
-                ("model_id", "=", model.id),
-                ("ttype", "in", ["many2one", "one2many", "many2many"]),
-            ]
+
+    # Custom models and fields change the model graphs, which are persisted
+    # in the graph cache under the generation of the module graph
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['ir.module.module']._bump_graph_generation()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env['ir.module.module']._bump_graph_generation()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['ir.module.module']._bump_graph_generation()
+        return res
+
+    @api.model
+    @tools.ormcache("self.env['ir.module.module']._get_graph_cache_token()")
+    def _get_model_relation_index(self):
+        """Get the relation name → referencing fields index of the registry.
+
+        The index is built in one bulk read and reloaded whenever the graph
+        generation is bumped, e.g. when models or fields change.
+
+        Returns:
+            ModelRelationIndex instance (read-only, shared between requests)
+        """
+        return ModelRelationIndex.load(self.sudo().env)
+
+    @api.model
+    def _get_graph_catalog_etag(self):
+        """Get the ETag of the model catalog.
+
+        Models change with the module graph generation, or with a registry
+        reload (e.g. custom models), whose sequence is shared by all workers.
+        """
+        return 'model-%s-%s-%s' % (
+            self.env['ir.module.module']._get_graph_generation(),
+            self.env.registry.registry_sequence,
+            self.env.lang or 'en_US',
         )
-        
-        # Find target models for each relational field
-        for field in relational_fields:
-            if field.relation:
-                target_model = self.env["ir.model"].search(
-                    [("model", "=", field.relation)], limit=1
-                )
-                if target_model:
-                    # Store the field information with the target model for edge creation
-                    target_model.field_info = {
-                        "name": field.name,
-                        "type": field.ttype
-                    }
-                    related_models.append(target_model)
-        
-        return related_models
-    
+
+    @api.model
+    @tools.ormcache('self.env.lang', "self.env['ir.module.module']._get_graph_cache_token()")
+    def _get_graph_catalog(self):
+        """Get the model list of the graph components in compact form.
+
+        Every model is sent with the first installed module defining it (as
+        the 'modules' field does), without computing 'modules' for all
+        models. Module descriptions and icon URLs are sent once per module.
+
+        Returns:
+            dict: 'columns', one array per model in 'rows', 'modules' as
+                  {name: [shortdesc, icon URL]}
+        """
+        self.env.cr.execute("""
+            SELECT d.res_id, min(d.module)
+              FROM ir_model_data d
+              JOIN ir_module_module m ON m.name = d.module AND m.state = 'installed'
+             WHERE d.model = 'ir.model'
+             GROUP BY d.res_id
+        """)
+        module_of = dict(self.env.cr.fetchall())
+        columns = ['id', 'name', 'model', 'module']
+        rows = [
+            [vals['id'], vals['name'], vals['model'], module_of.get(vals['id'], 'base')]
+            for vals in self.search_read([], ['name', 'model'], order='name')
+        ]
+        module_names = {row[3] for row in rows}
+        modules = self.env['ir.module.module'].search_read(
+            [('name', 'in', list(module_names))], ['name', 'shortdesc', 'icon']
+        )
+        return {
+            'generation': self.env['ir.module.module']._get_graph_generation(),
+            'columns': columns,
+            'rows': rows,
+            'modules': {vals['name']: [vals['shortdesc'], vals['icon'] or False] for vals in modules},
+        }
+
+    def _build_model_graph_by_levels(self, max_depth, current_depth, visited_models, options, get_level_edges):
+        """Build a model relation graph breadth-first, one level at a time.
+
+        Cycles are marked like in module graphs, from the strongly connected
+        components of the built graph. The max_nodes, max_edges and
+        time_budget_ms budgets apply as in _build_graph_core.
+
+        Args:
+            max_depth: Maximum depth to traverse, falsy for no limit
+            current_depth: Depth of the starting models
+            visited_models: Ids of models that must not be reached again
+            options: Dictionary of graph options (filters and budgets)
+            get_level_edges: Function returning the edges leaving a whole
+                             frontier as (from_id, to_id, field, ttype, reached_id)
+
+        Returns:
+            dict: Dictionary with 'nodes' and 'edges' lists representing the graph.
+                  When a budget is set, 'truncated' tells whether it ran out and
+                  'frontier' lists the ids of the models left unexpanded.
+        """
+        budget = self._init_graph_budget(options)
+        depth_of, level_edges = self._walk_model_levels(
+            max_depth, current_depth, visited_models, options, get_level_edges, budget
+        )
+        nodes = [
+            self._create_model_node(model, {"current_depth": depth_of[model.id]})
+            for model in self.browse(list(depth_of))
+        ]
+        edges = [
+            {"from": from_id, "to": to_id, "field": field_name, "type": ttype}
+            for from_id, to_id, field_name, ttype in level_edges
+        ]
+        cycles = defaultdict(set)
+        for model_id, cycle_id in self._get_model_cycle_ids(depth_of, level_edges).items():
+            cycles[cycle_id].add(model_id)
+        self._annotate_graph_cycles(nodes, edges, dict(cycles))
+
+        result = {"nodes": nodes, "edges": edges}
+        if budget:
+            result["truncated"] = budget["exhausted"]
+            result["frontier"] = sorted(budget["frontier"])
+        return result
+
+    def _walk_model_levels(self, max_depth, current_depth, visited_models, options, get_level_edges, budget=None):
+        """Traverse the model relations breadth-first, one level at a time.
+
+        Edges are deduplicated on (from, to, field) in both directions.
+
+        Args:
+            budget: Budget state created by _init_graph_budget, if any. Once
+                    it runs out the traversal stops, and the models whose
+                    relations were not all followed are added to its frontier.
+
+        Returns:
+            Tuple (depth by model id, list of (from_id, to_id, field, ttype) edges)
+        """
+        visited = set(visited_models or ())
+        depth_of = {}
+        for model_id in self.ids:
+            # Start models must fit in the budget
+            if budget and not self._consume_graph_budget(budget, node_ids=[model_id]):
+                budget["frontier"].add(model_id)
+                continue
+            depth_of[model_id] = current_depth
+        frontier = list(depth_of)
+        depth = current_depth
+        edges = []
+        seen_edges = set()
+        while frontier and not (max_depth and depth >= max_depth):
+            if budget and not self._consume_graph_budget(budget):
+                budget["frontier"].update(frontier)
+                break
+            next_frontier = []
+            level_edges = get_level_edges(frontier, options)
+            for position, (from_id, to_id, field_name, ttype, reached_id) in enumerate(level_edges):
+                if reached_id in visited and reached_id not in depth_of:
+                    continue
+                edge_key = (from_id, to_id, field_name)
+                if edge_key in seen_edges:
+                    continue
+                if budget and not self._consume_graph_budget(budget, node_ids=[reached_id], edge_count=1):
+                    # Models of this level with relations left, and the
+                    # reached models that will not be expanded
+                    budget["frontier"].update(
+                        edge[1] if edge[4] == edge[0] else edge[0]
+                        for edge in level_edges[position:]
+                    )
+                    if not (max_depth and depth + 1 >= max_depth):
+                        budget["frontier"].update(next_frontier)
+                    return depth_of, edges
+                if reached_id not in depth_of:
+                    depth_of[reached_id] = depth + 1
+                    next_frontier.append(reached_id)
+                seen_edges.add(edge_key)
+                edges.append((from_id, to_id, field_name, ttype))
+            frontier = next_frontier
+            depth += 1
+        return depth_of, edges
+
+    @staticmethod
+    def _get_model_cycle_ids(model_ids, edges):
+        """Number the cycles of a model graph with one Tarjan pass.
+
+        Args:
+            model_ids: Ids of the models of the graph
+            edges: (from_id, to_id, field, ttype) edges of the graph
+
+        Returns:
+            dict: Cycle id by model id, for the models in a cycle
+        """
+        successors = defaultdict(list)
+        for from_id, to_id, _field_name, _ttype in edges:
+            successors[from_id].append(to_id)
+        return number_cycles(strongly_connected_components(
+            model_ids, lambda model_id: successors.get(model_id, [])
+        ))
+
+    def _get_graph_export_events(self, max_depth=2, options=None):
+        """Get the events of a model graph export, see graph_export.export_graph.
+
+        The level queries run here, as compact tuples, the returned
+        generator only formats them and no longer needs the database.
+
+        Args:
+            max_depth: Maximum depth to traverse
+            options: Same options as get_model_relation_graph
+
+        Returns:
+            Generator of ('node', id, attrs) and ('edge', from_id, to_id, attrs) tuples
+        """
+        options = options or {}
+        if options.get("direction") == "reverse":
+            get_level_edges = self._get_reverse_level_edges
+        else:
+            get_level_edges = self._get_forward_level_edges
+        depth_of, edges = self._walk_model_levels(max_depth, 0, None, options, get_level_edges)
+        cycle_of = self._get_model_cycle_ids(depth_of, edges)
+        labels = {
+            vals["id"]: (vals["name"], vals["model"])
+            for vals in self.browse(list(depth_of)).read(["name", "model"])
+        }
+        return self._export_model_events(depth_of, edges, labels, cycle_of)
+
+    @staticmethod
+    def _export_model_events(depth_of, edges, labels, cycle_of):
+        for model_id, depth in depth_of.items():
+            name, model_name = labels.get(model_id, ("", ""))
+            yield "node", model_id, {
+                "label": name,
+                "model": model_name,
+                "cycle_id": cycle_of.get(model_id),
+                "depth": depth,
+            }
+        for from_id, to_id, field_name, ttype in edges:
+            yield "edge", from_id, to_id, {"field": field_name, "type": ttype}
+
+    @api.model
+    def _get_forward_level_edges(self, frontier, options):
+        """Get the relational fields of a frontier of models in one query.
+
+        Field types, excluded (hub) models, transient models and the module
+        filter are evaluated by the query itself, so unwanted models never
+        reach the next frontier.
+        """
+        self.env["ir.model"].flush_model(["model", "transient"])
+        self.env["ir.model.fields"].flush_model(["model_id", "name", "ttype", "relation"])
+        query, params = self._build_forward_relation_query(frontier, options)
+        self.env.cr.execute(query, params)
+        return [
+            (model_id, target_id, field_name, ttype, target_id)
+            for model_id, field_name, ttype, target_id in self.env.cr.fetchall()
+        ]
+
+    @api.model
+    def _build_forward_relation_query(self, frontier, options):
+        """Build the SQL query returning the relations leaving a frontier.
+
+        Args:
+            frontier: Ids of the models to expand
+            options: Dictionary of graph options
+                - ttypes: Relational field types to follow, a single type is accepted
+                - exclude_models: Technical names of (hub) models not to follow,
+                  a single name is accepted
+                - exclude_transient: Do not follow relations to transient models
+                - modules: Only follow relations to models defined or extended by
+                  these modules, a single name is accepted
+
+        Returns:
+            Tuple (query, params) returning (model_id, field_name, ttype, target_id) rows
+        """
+        conditions = ["f.model_id IN %(frontier)s", "f.ttype IN %(ttypes)s"]
+        params = {
+            "frontier": tuple(frontier),
+            "ttypes": _as_ttypes(options.get("ttypes")),
+        }
+        if options.get("exclude_models"):
+            conditions.append("target.model NOT IN %(exclude_models)s")
+            params["exclude_models"] = tuple(_as_list(options["exclude_models"]))
+        if options.get("exclude_transient"):
+            conditions.append("target.transient IS NOT TRUE")
+        if options.get("modules"):
+            conditions.append("""EXISTS (
+                SELECT 1 FROM ir_model_data d
+                 WHERE d.model = 'ir.model' AND d.res_id = target.id AND d.module IN %(modules)s
+            )""")
+            params["modules"] = tuple(_as_list(options["modules"]))
+
+        query = """
+            SELECT f.model_id, f.name, f.ttype, target.id
+              FROM ir_model_fields f
+              JOIN ir_model target ON target.model = f.relation
+             WHERE {}
+             ORDER BY f.model_id, f.name
+        """.format("\n               AND ".join(conditions))
+        return query, params
+
+    @api.model
+    def _get_reverse_level_edges(self, frontier, options):
+        """Get the fields referencing a frontier of models from the relation index.
+
+        Every level costs dictionary lookups only, filters are applied by
+        the index itself. Edges go from the referencing model to the
+        referenced one.
+        """
+        index = self._get_model_relation_index()
+        ttypes = _as_ttypes(options.get("ttypes"))
+        modules = _as_list(options.get("modules"))
+        exclude_models = _as_list(options.get("exclude_models"))
+        edges = []
+        for model_id in frontier:
+            referencing_fields = index.get_referencing_fields(
+                index.model_names.get(model_id),
+                ttypes=ttypes,
+                exclude_transient=options.get("exclude_transient", False),
+                exclude_abstract=options.get("exclude_abstract", False),
+                exclude_models=exclude_models,
+                modules=modules,
+            )
+            edges.extend(
+                (source_id, model_id, field_name, ttype, source_id)
+                for source_id, field_name, ttype in referencing_fields
+            )
+        return edges
+
     def _create_model_node(self, model, options):
         """Create a node dictionary for a model record."""
         return {
@@ -76,16 +405,26 @@ class IrModel(models.Model):
             "depth": options.get("current_depth", 0),
         }
     
-    def _create_model_relation_edge(self, source_model, target_model):
-        """Create an edge dictionary for a model relation."""
-        field_info = getattr(target_model, 'field_info', {})
-        return {
-            "from": source_model.id,
-            "to": target_model.id,
-            "field": field_info.get("name", ""),
-            "type": field_info.get("type", ""),
-        }
-    
     def _create_node_data(self, record, options):
         """Override from graph.builder.mixin to use model-specific node creation."""
         return self._create_model_node(record, options)
+
+
+class IrModelFields(models.Model):
+    _inherit = 'ir.model.fields'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['ir.module.module']._bump_graph_generation()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env['ir.module.module']._bump_graph_generation()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['ir.module.module']._bump_graph_generation()
+        return res
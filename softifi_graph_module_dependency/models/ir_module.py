@@ -1,19 +1,169 @@
-from odoo import models, api
+from odoo import _, models, api, tools
+from odoo.exceptions import UserError
 import logging
 from .graph_builder import GraphBuilderMixin
 from .module_category_helper import ModuleCategoryHelper
+from .graph_snapshot import GraphSnapshotHelper
+from .category_graph_helper import CategoryGraphHelper
+from .graph_single_flight import single_flight
+from .graph_cache_entry import graph_cached
+from .module_cycle_index import ModuleCycleIndex
+from .module_graph_index import ModuleGraphIndex
 
 _logger = logging.getLogger(__name__)
 
+GENERATION_PARAM = 'softifi_graph_module_dependency.graph_generation'
+
+# Fields of ir.module.module that module graphs depend on
+GRAPH_FIELDS = {'name', 'state', 'category_id', 'latest_version'}
+
+IMPACT_ACTIONS = ('uninstall', 'upgrade')
+# States of the modules an uninstall or upgrade spreads to
+IMPACT_STATES = ('installed', 'to upgrade')
+# What happens to the affected modules and their data, by impact action
+IMPACT_EFFECTS = {
+    'uninstall': 'removed',
+    'upgrade': 'updated',
+}
+
 
 class Module(models.Model):
     _name = 'ir.module.module'
     _inherit = ["ir.module.module", "graph.builder.mixin"]
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        modules = super().create(vals_list)
+        self._bump_graph_generation()
+        return modules
+
+    def write(self, vals):
+        res = super().write(vals)
+        if GRAPH_FIELDS.intersection(vals):
+            self._bump_graph_generation()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self._bump_graph_generation()
+        return res
+
+    def button_install(self):
+        self._bump_graph_generation()
+        return super().button_install()
+
+    def button_upgrade(self):
+        self._bump_graph_generation()
+        return super().button_upgrade()
+
+    def button_uninstall(self):
+        self._bump_graph_generation()
+        return super().button_uninstall()
+
+    # The immediate variants reload the registry, so the generation is
+    # bumped (and committed with the button changes) before doing so
+
+    def button_immediate_install(self):
+        self._bump_graph_generation()
+        return super().button_immediate_install()
+
+    def button_immediate_upgrade(self):
+        self._bump_graph_generation()
+        return super().button_immediate_upgrade()
+
+    def button_immediate_uninstall(self):
+        self._bump_graph_generation()
+        return super().button_immediate_uninstall()
+
+    @api.model
+    def update_list(self):
+        res = super().update_list()
+        self._bump_graph_generation()
+        return res
+
+    def _update_dependencies(self, depends=None, auto_install_requirements=()):
+        # Dependencies are rewritten with plain SQL, bypassing the ORM overrides
+        res = super()._update_dependencies(depends, auto_install_requirements)
+        self._bump_graph_generation()
+        return res
+
+    def _update_exclusions(self, excludes=None):
+        res = super()._update_exclusions(excludes)
+        self._bump_graph_generation()
+        return res
+
+    @api.model
+    def _get_graph_generation(self):
+        """Get the generation of the module graph.
+
+        The value is read through the cached ir.config_parameter lookup, so
+        checking it costs one database read per worker and generation.
+
+        Returns:
+            int: Counter increased whenever modules, their states,
+                 dependencies, exclusions, categories, or models and
+                 fields change
+        """
+        return int(self.env['ir.config_parameter'].sudo().get_param(GENERATION_PARAM, 0))
+
     @api.model
+    def _get_committed_graph_generation(self, cr):
+        """Get the generation of the module graph as committed in the database.
+
+        Args:
+            cr: Cursor of another transaction, which does not see an
+                uncommitted bump of the current one
+
+        Returns:
+            int: Committed generation, bypassing the parameter cache
+        """
+        cr.execute("SELECT value FROM ir_config_parameter WHERE key = %s", [GENERATION_PARAM])
+        row = cr.fetchone()
+        return int(row[0]) if row else 0
+
+    @api.model
+    def _bump_graph_generation(self):
+        """Increase the generation of the module graph, once per transaction.
+
+        Storing the counter with set_param clears the registry caches (the
+        module/category/cycle indexes), and Odoo signals this invalidation to
+        all the other workers at the end of the request, which then re-read
+        the counter and ignore the graph cache entries of older generations.
+        """
+        callbacks = self.env.cr.precommit
+        if not callbacks.data.get(GENERATION_PARAM):
+            self.env['ir.config_parameter'].sudo().set_param(
+                GENERATION_PARAM, self._get_graph_generation() + 1
+            )
+            callbacks.data[GENERATION_PARAM] = True
+        else:
+            # Later changes of the same transaction only drop the graph indexes
+            registry = self.env.registry
+            registry.graph_cache_token = getattr(registry, 'graph_cache_token', 0) + 1
+
+    @api.model
+    def _get_graph_cache_token(self):
+        """Get the key invalidating the in-memory graph indexes.
+
+        The indexes (module graph, cycles, categories, catalogs) are cached
+        under the graph generation and a counter of the changes this process
+        made since, so changes only drop these entries and not the whole
+        registry cache.
+        """
+        return self._get_graph_generation(), getattr(self.env.registry, 'graph_cache_token', 0)
+
+    @api.model
+    @graph_cached
+    @single_flight
     def get_module_graph(self, module_ids, options=None):
-        """Build a dependency graph following module dependencies."""
+        """Build a dependency graph following module dependencies.
+
+        With a page_size option, returns one page of the graph in
+        breadth-first order, see CategoryGraphHelper.get_page.
+        """
         options = options or {}
+        if options.get("page_size"):
+            return CategoryGraphHelper(self.env).get_page(module_ids, options)
         if options.get("max_depth", -1) == 0:
             modules = self.browse(module_ids)
             nodes = [
@@ -48,9 +198,17 @@ class Module(models.Model):
         )
 
     @api.model
+    @graph_cached
+    @single_flight
     def get_reverse_dependency_graph(self, module_ids, options=None):
-        """Build a reverse dependency graph showing dependent modules."""
+        """Build a reverse dependency graph showing dependent modules.
+
+        With a page_size option, returns one page of the graph in
+        breadth-first order, see CategoryGraphHelper.get_page.
+        """
         options = options or {}
+        if options.get("page_size"):
+            return CategoryGraphHelper(self.env).get_page(module_ids, options, reverse=True)
         if options.get("max_depth", -1) == 0:
             modules = self.browse(module_ids)
             nodes = [
@@ -220,6 +378,8 @@ class Module(models.Model):
         return False
         
     @api.model
+    @graph_cached
+    @single_flight
     def get_category_module_graph(self, category_prefixes=None, options=None):
         """Build a dependency graph for modules matching category patterns.
         
@@ -229,38 +389,33 @@ class Module(models.Model):
             options: Dictionary of options controlling graph behavior
                 - exact_match: If True, only match exact category names, not prefixes
                 - include_subcategories: If True, include modules from subcategories
-                - whitelist: List of patterns (plain substrings or regex) to include
+                - whitelist: List of patterns to include
                 - blacklist: List of patterns to exclude
+                - pattern_mode: 'substring' (default, literal text as with ilike),
+                  'prefix' or 'regex'
                 - include_missing: Boolean indicating whether to include modules with no category
+                - match_module_names: If True, whitelist/blacklist also match module technical names
                 - max_depth: Maximum depth to traverse in the graph
                 - stop_domains: List of domains to stop traversal
                 - exclude_domains: List of domains to exclude modules
+                - aggregate: If "category", collapse modules into one weighted node per category
+                - page_size / cursor: Return the graph page by page, see CategoryGraphHelper.get_page
             
         Returns:
             dict: Dictionary with 'nodes' and 'edges' lists representing the graph
         """
         options = options or {}
-        
-        # Extract category-specific options
-        category_options = {
-            'exact_match': options.pop('exact_match', False) if 'exact_match' in options else False,
-            'include_subcategories': options.pop('include_subcategories', True) if 'include_subcategories' in options else True
-        }
-        
-        # Add whitelist/blacklist/include_missing if present
-        if 'whitelist' in options:
-            category_options['whitelist'] = options.pop('whitelist')
-        if 'blacklist' in options:
-            category_options['blacklist'] = options.pop('blacklist')
-        if 'include_missing' in options:
-            category_options['include_missing'] = options.pop('include_missing')
-        
-        # Get modules matching the criteria
-        category_helper = ModuleCategoryHelper(self.env)
-        modules = category_helper.get_modules_by_category_prefixes(category_prefixes, category_options)
+        modules = self._get_category_modules(category_prefixes, options)
         
         if not modules:
             return {"nodes": [], "edges": []}
+
+        # Collapse modules into one node per category
+        if options.get("aggregate") == "category":
+            return CategoryGraphHelper(self.env).build_quotient_graph(modules.ids, options)
+
+        if options.get("page_size"):
+            return CategoryGraphHelper(self.env).get_page(modules.ids, options)
             
         # If max_depth is 0, just return the nodes without edges
         if options.get("max_depth", -1) == 0:
@@ -296,6 +451,8 @@ class Module(models.Model):
         )
         
     @api.model
+    @graph_cached
+    @single_flight
     def get_reverse_category_module_graph(self, category_prefixes=None, options=None):
         """Build a reverse dependency graph for modules matching category patterns.
         
@@ -305,38 +462,33 @@ class Module(models.Model):
             options: Dictionary of options controlling graph behavior
                 - exact_match: If True, only match exact category names, not prefixes
                 - include_subcategories: If True, include modules from subcategories
-                - whitelist: List of patterns (plain substrings or regex) to include
+                - whitelist: List of patterns to include
                 - blacklist: List of patterns to exclude
+                - pattern_mode: 'substring' (default, literal text as with ilike),
+                  'prefix' or 'regex'
                 - include_missing: Boolean indicating whether to include modules with no category
+                - match_module_names: If True, whitelist/blacklist also match module technical names
                 - max_depth: Maximum depth to traverse in the graph
                 - stop_domains: List of domains to stop traversal
                 - exclude_domains: List of domains to exclude modules
+                - aggregate: If "category", collapse modules into one weighted node per category
+                - page_size / cursor: Return the graph page by page, see CategoryGraphHelper.get_page
             
         Returns:
             dict: Dictionary with 'nodes' and 'edges' lists representing the graph
         """
         options = options or {}
-        
-        # Extract category-specific options
-        category_options = {
-            'exact_match': options.pop('exact_match', False) if 'exact_match' in options else False,
-            'include_subcategories': options.pop('include_subcategories', True) if 'include_subcategories' in options else True
-        }
-        
-        # Add whitelist/blacklist/include_missing if present
-        if 'whitelist' in options:
-            category_options['whitelist'] = options.pop('whitelist')
-        if 'blacklist' in options:
-            category_options['blacklist'] = options.pop('blacklist')
-        if 'include_missing' in options:
-            category_options['include_missing'] = options.pop('include_missing')
-        
-        # Get modules matching the criteria
-        category_helper = ModuleCategoryHelper(self.env)
-        modules = category_helper.get_modules_by_category_prefixes(category_prefixes, category_options)
+        modules = self._get_category_modules(category_prefixes, options)
         
         if not modules:
             return {"nodes": [], "edges": []}
+
+        # Collapse modules into one node per category
+        if options.get("aggregate") == "category":
+            return CategoryGraphHelper(self.env).build_quotient_graph(modules.ids, options, reverse=True)
+
+        if options.get("page_size"):
+            return CategoryGraphHelper(self.env).get_page(modules.ids, options, reverse=True)
             
         # If max_depth is 0, just return the nodes without edges
         if options.get("max_depth", -1) == 0:
@@ -370,3 +522,356 @@ class Module(models.Model):
             should_stop_traversal=self._should_stop_graph_traversal,
             check_exclusion=self._check_module_exclusion,
         )
+
+    @api.model
+    @graph_cached
+    @single_flight
+    def expand_category_graph_node(self, category_prefixes=None, category_id=False, options=None):
+        """Expand one category node of a category-collapsed graph into its modules.
+
+        Args:
+            category_prefixes: Category prefixes the collapsed graph was built from
+            category_id: Id of the category to expand (False for uncategorized modules)
+            options: Same options as get_category_module_graph, plus
+                - reverse: If True, the collapsed graph follows reverse dependencies
+
+        Returns:
+            dict: Module 'nodes' and 'edges' replacing the 'category_node' super-node
+        """
+        options = options or {}
+        modules = self._get_category_modules(category_prefixes, options)
+        if not modules:
+            return {"category_node": CategoryGraphHelper.get_node_id(category_id), "nodes": [], "edges": []}
+        return CategoryGraphHelper(self.env).expand_category(
+            modules.ids, category_id, options, reverse=options.get("reverse", False)
+        )
+
+    def _get_category_modules(self, category_prefixes, options):
+        """Get modules matching the category options, popping them from options.
+
+        Args:
+            category_prefixes: List of category prefixes to match
+            options: Dictionary of graph options, category-specific keys are removed
+
+        Returns:
+            Recordset of ir.module.module records
+        """
+        # Extract category-specific options
+        category_options = {
+            'exact_match': options.pop('exact_match', False),
+            'include_subcategories': options.pop('include_subcategories', True),
+        }
+
+        # Add whitelist/blacklist/include_missing if present
+        for key in ('whitelist', 'blacklist', 'pattern_mode', 'include_missing', 'match_module_names'):
+            if key in options:
+                category_options[key] = options.pop(key)
+
+        # Get modules matching the criteria
+        category_helper = ModuleCategoryHelper(self.env)
+        return category_helper.get_modules_by_category_prefixes(category_prefixes, category_options)
+
+    @api.model
+    @graph_cached
+    @single_flight
+    def get_installation_graph(self, options=None):
+        """Build the graph of all installed modules and their dependencies.
+
+        Args:
+            options: Dictionary of options controlling graph behavior
+                - include_exclusions: Whether to include exclusion edges
+
+        Returns:
+            dict: Dictionary with 'nodes' and 'edges' lists representing the graph
+        """
+        options = options or {}
+        helper = CategoryGraphHelper(self.env)
+        index = helper.index
+        installed_ids = sorted(
+            module_id for module_id, vals in index.modules.items() if vals['state'] == 'installed'
+        )
+        installed = set(installed_ids)
+        nodes = [helper.create_module_node(module_id, 0) for module_id in installed_ids]
+        edges = [
+            {"from": from_id, "to": to_id, "type": edge_type}
+            for from_id, to_id, edge_type in index.edges(options.get("include_exclusions", True))
+            if from_id in installed and to_id in installed
+        ]
+        self._get_graph_cycle_index().annotate(nodes, edges)
+        return {"nodes": nodes, "edges": edges}
+
+    @api.model
+    def _get_graph_export_events(self, graph, module_ids=None, category_prefixes=None, options=None):
+        """Get the events of a module graph export, see graph_export.export_graph.
+
+        Args:
+            graph: "module", "reverse", "category" or "category_reverse"
+            module_ids: Ids of the modules to start from (module graphs)
+            category_prefixes: Category prefixes of the modules to start from (category graphs)
+            options: Same options as the matching get_*_graph method
+
+        Returns:
+            Generator of graph events that no longer needs the database
+        """
+        options = dict(options or {})
+        if graph in ("category", "category_reverse"):
+            module_ids = self._get_category_modules(category_prefixes, options).ids
+        return CategoryGraphHelper(self.env).iter_export_events(
+            module_ids or [], options, reverse=graph in ("reverse", "category_reverse")
+        )
+
+    @api.model
+    @graph_cached
+    @single_flight
+    def impact_analysis(self, module_ids, action='uninstall'):
+        """Get the installed modules affected by uninstalling or upgrading modules.
+
+        The affected modules are the reverse dependency closure of the
+        targets, restricted to installed modules: uninstalling or upgrading
+        a module does the same to every installed module depending on it, so
+        both actions affect the same modules. Their footprints are counted
+        with one grouped query on ir_model_data.
+
+        The actions differ in what happens to the footprints. Uninstalled
+        modules are 'removed': their models, fields (with the table columns)
+        and data records are deleted, which 'data_loss' reports. Upgraded
+        modules are 'updated': their data is reloaded and nothing is lost.
+        Affected modules flagged 'auto_install' were installed automatically,
+        uninstalling them is usually unexpected.
+
+        Args:
+            module_ids: Ids of the modules to uninstall or upgrade
+            action: "uninstall" or "upgrade"
+
+        Returns:
+            dict: Affected 'modules' ranked by footprint (fields, then models
+                  and data records), with their 'depth' from the targets and
+                  'effect', the 'totals' of the footprints (zeros when no
+                  module is affected) and 'data_loss'
+        """
+        if action not in IMPACT_ACTIONS:
+            raise UserError(_("Unsupported impact analysis action: %s", action))
+        module_ids = module_ids if isinstance(module_ids, list) else [module_ids]
+
+        index = self._get_graph_index()
+        not_installed = {
+            module_id for module_id, vals in index.modules.items()
+            if vals['state'] not in IMPACT_STATES
+        }
+        depth_of = {
+            event[1]: event[2]
+            for event in index.walk(
+                module_ids, reverse=True, include_exclusions=False, excluded_ids=not_installed
+            )
+            if event[0] == 'node'
+        }
+        names = [index.name(module_id) for module_id in depth_of]
+        footprints = {}
+        if names:
+            footprints = self._get_impact_footprints(names)
+
+        fields = ['name', 'shortdesc', 'state', 'auto_install']
+        if 'is_custom' in self._fields:
+            fields.append('is_custom')
+        modules = []
+        for vals in self.browse(list(depth_of)).read(fields):
+            models_count, fields_count, records_count = footprints.get(vals['name'], (0, 0, 0))
+            modules.append(dict(
+                vals,
+                depth=depth_of[vals['id']],
+                target=vals['id'] in module_ids,
+                effect=IMPACT_EFFECTS[action],
+                models=models_count,
+                fields=fields_count,
+                records=records_count,
+            ))
+        modules.sort(key=lambda m: (-m['fields'], -m['models'], -m['records'], m['name']))
+        for rank, module in enumerate(modules, start=1):
+            module['rank'] = rank
+
+        totals = {
+            "modules": len(modules),
+            "models": sum(m['models'] for m in modules),
+            "fields": sum(m['fields'] for m in modules),
+            "records": sum(m['records'] for m in modules),
+            "auto_install_modules": sum(1 for m in modules if m['auto_install'] and not m['target']),
+        }
+        if 'is_custom' in self._fields:
+            totals["custom_modules"] = sum(1 for m in modules if m['is_custom'])
+        return {
+            "action": action,
+            "targets": module_ids,
+            "modules": modules,
+            "totals": totals,
+            "data_loss": action == 'uninstall' and any(totals[key] for key in ('models', 'fields', 'records')),
+        }
+
+    @api.model
+    def _get_impact_footprints(self, names):
+        """Count the models, fields and data records of modules in one query.
+
+        Returns:
+            dict: {module name: (models, fields, records)}
+        """
+        self.env['ir.model.data'].flush_model(['module', 'model'])
+        self.env.cr.execute("""
+            SELECT module,
+                   count(*) FILTER (WHERE model = 'ir.model'),
+                   count(*) FILTER (WHERE model = 'ir.model.fields'),
+                   count(*)
+              FROM ir_model_data
+             WHERE module IN %s
+             GROUP BY module
+        """, [tuple(names)])
+        return {name: tuple(counts) for name, *counts in self.env.cr.fetchall()}
+
+    @api.model
+    @graph_cached
+    @single_flight
+    def get_cycle_report(self, options=None):
+        """Report all the cycles of the module graph of the installation.
+
+        Args:
+            options: Dictionary of options
+                - include_exclusions: Whether exclusion edges close cycles too (default False)
+                - installed_only: Only consider installed modules (default True)
+
+        Returns:
+            dict: 'cycles' with their member 'modules' and 'edges', 'cycle_count' and 'module_count'
+        """
+        options = options or {}
+        cycle_index = self._get_graph_cycle_index(
+            options.get("installed_only", True),
+            options.get("include_exclusions", False),
+        )
+        names = {
+            vals['id']: vals for vals in
+            self.browse(list(cycle_index.cycle_of)).read(['name', 'shortdesc', 'state'])
+        }
+        return {
+            "module_count": cycle_index.module_count,
+            "cycle_count": len(cycle_index.cycles),
+            "cycles": [
+                {
+                    "id": cycle_id,
+                    "modules": [
+                        {
+                            "id": module_id,
+                            "label": names[module_id]['name'],
+                            "description": names[module_id]['shortdesc'],
+                            "state": names[module_id]['state'],
+                        }
+                        for module_id in cycle['modules']
+                    ],
+                    "edges": [
+                        {"from": from_id, "to": to_id, "type": edge_type}
+                        for from_id, to_id, edge_type in cycle['edges']
+                    ],
+                }
+                for cycle_id, cycle in cycle_index.cycles.items()
+            ],
+        }
+
+    @api.model
+    @tools.ormcache('self._get_graph_cache_token()')
+    def _get_graph_index(self):
+        """Get the in-memory index of the module graph, loaded once per registry.
+
+        Reloaded whenever the graph generation is bumped.
+
+        Returns:
+            ModuleGraphIndex instance (read-only, shared between requests)
+        """
+        return ModuleGraphIndex.load(self.sudo().env)
+
+    @api.model
+    @tools.ormcache('installed_only', 'include_exclusions', 'self._get_graph_cache_token()')
+    def _get_graph_cycle_index(self, installed_only=True, include_exclusions=False):
+        """Get the cycle index of the module graph, computed once per registry.
+
+        Args:
+            installed_only: Only consider installed modules
+            include_exclusions: Whether exclusion edges close cycles too
+
+        Returns:
+            ModuleCycleIndex instance (read-only, shared between requests)
+        """
+        return ModuleCycleIndex(
+            self._get_graph_index(),
+            states=('installed',) if installed_only else None,
+            include_exclusions=include_exclusions,
+        )
+
+    def _annotate_graph_cycles(self, nodes, edges, cycles):
+        """Mark dependency cycles by lookup in the cycle index of all modules.
+
+        Unlike the detection during the traversal, modules are marked even
+        when the graph only reaches a part of their cycle. Cycles detected
+        during the traversal that the index does not hold (e.g. closed by
+        exclusion edges) are marked too, numbered after the ones of the index.
+        """
+        cycle_index = self._get_graph_cycle_index(installed_only=False)
+        cycle_index.annotate(nodes, edges)
+        if cycles:
+            offset = max(cycle_index.cycles, default=0)
+            super()._annotate_graph_cycles(
+                [node for node in nodes if not node.get("in_cycle")],
+                [edge for edge in edges if not edge.get("in_cycle")],
+                {offset + cycle_id: members for cycle_id, members in cycles.items()},
+            )
+
+    @api.model
+    def _get_graph_catalog_etag(self):
+        """Get the ETag of the module catalog, which changes with the graph generation."""
+        return 'module-%s-%s' % (self._get_graph_generation(), self.env.lang or 'en_US')
+
+    @api.model
+    @tools.ormcache('self.env.lang', 'self._get_graph_cache_token()')
+    def _get_graph_catalog(self):
+        """Get the module list of the graph components in compact form.
+
+        Rows only hold the columns displayed by the components, categories
+        are sent once by id, and icons are the URLs of static files instead
+        of inlined images. The catalog is dropped with the registry caches,
+        i.e. on every graph generation bump.
+
+        Returns:
+            dict: 'columns', one array per module in 'rows', 'categories' names by id
+        """
+        columns = ['id', 'name', 'shortdesc', 'state', 'category_id', 'application', 'module_type', 'icon']
+        modules = self.search_read([], columns, order='shortdesc')
+        categories = {}
+        rows = []
+        for vals in modules:
+            if vals['category_id']:
+                categories[vals['category_id'][0]] = vals['category_id'][1]
+                vals['category_id'] = vals['category_id'][0]
+            rows.append([vals[column] for column in columns])
+        return {
+            'generation': self._get_graph_generation(),
+            'columns': columns,
+            'rows': rows,
+            'categories': categories,
+        }
+
+    @api.model
+    def export_graph_snapshot(self):
+        """Export the full module graph of the database as a versioned snapshot.
+
+        Returns:
+            dict: Snapshot identifying modules by technical name
+        """
+        return GraphSnapshotHelper(self.env).export_snapshot()
+
+    @api.model
+    def diff_graph_snapshots(self, snapshot_a, snapshot_b):
+        """Compare two module graph snapshots.
+
+        Args:
+            snapshot_a: Reference snapshot
+            snapshot_b: Snapshot to compare against the reference
+
+        Returns:
+            dict: Added/removed modules and edges, state changes and new cycles
+        """
+        return GraphSnapshotHelper.diff_snapshots(snapshot_a, snapshot_b)
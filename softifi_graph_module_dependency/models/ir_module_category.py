@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from odoo import models, api, tools
+from .module_category_helper import CategoryTree
+
+
+class ModuleCategory(models.Model):
+    _inherit = 'ir.module.category'
+
+    @api.model
+    @tools.ormcache('self.env.lang', "self.env['ir.module.module']._get_graph_cache_token()")
+    def _get_graph_category_tree(self):
+        """Get the category tree used by ModuleCategoryHelper.
+
+        The tree is loaded once per registry and language, and is dropped
+        whenever categories or module categories change, through the graph
+        generation bump.
+
+        Returns:
+            CategoryTree instance (read-only, shared between requests)
+        """
+        return CategoryTree.load(self.sudo().env)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        categories = super().create(vals_list)
+        self.env['ir.module.module']._bump_graph_generation()
+        return categories
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'name' in vals or 'parent_id' in vals:
+            self.env['ir.module.module']._bump_graph_generation()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['ir.module.module']._bump_graph_generation()
+        return res
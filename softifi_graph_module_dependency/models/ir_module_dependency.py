@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from odoo import models, api
+
+
+class ModuleDependency(models.Model):
+    _inherit = 'ir.module.module.dependency'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        dependencies = super().create(vals_list)
+        self.env['ir.module.module']._bump_graph_generation()
+        return dependencies
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env['ir.module.module']._bump_graph_generation()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['ir.module.module']._bump_graph_generation()
+        return res
+
+
+class ModuleExclusion(models.Model):
+    _inherit = 'ir.module.module.exclusion'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        exclusions = super().create(vals_list)
+        self.env['ir.module.module']._bump_graph_generation()
+        return exclusions
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env['ir.module.module']._bump_graph_generation()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['ir.module.module']._bump_graph_generation()
+        return res
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+import logging
+from collections import defaultdict
+
+_logger = logging.getLogger(__name__)
+
+RELATIONAL_TTYPES = ("many2one", "one2many", "many2many")
+
+
+class ModelRelationIndex:
+    """Index of relational fields keyed by the model they point at.
+
+    Answers "which fields reference this model" without querying
+    ir.model.fields. Fields are bucketed by ttype and by the kind of their
+    owner model (regular, transient or abstract), so that filters select
+    buckets instead of post-filtering fields. Instances are shared through
+    the registry cache and must be treated as read-only.
+    """
+
+    def __init__(self, models, fields, model_modules=()):
+        """
+        Args:
+            models: Iterable of (model_id, model_name, kind) tuples
+            fields: Iterable of (relation, model_id, field_name, ttype) tuples
+            model_modules: Iterable of (model_id, module_name) tuples
+        """
+        self.model_ids = {}
+        self.model_names = {}
+        self.kinds = {}
+        for model_id, model_name, kind in models:
+            self.model_ids[model_name] = model_id
+            self.model_names[model_id] = model_name
+            self.kinds[model_id] = kind
+
+        modules = defaultdict(set)
+        for model_id, module_name in model_modules:
+            modules[model_id].add(module_name)
+        self.modules = dict(modules)
+
+        referencing = defaultdict(lambda: defaultdict(list))
+        for relation, model_id, field_name, ttype in fields:
+            if model_id in self.kinds:
+                referencing[relation][(ttype, self.kinds[model_id])].append((model_id, field_name))
+        self.referencing = {relation: dict(buckets) for relation, buckets in referencing.items()}
+
+    @classmethod
+    def load(cls, env):
+        """Load the index with one bulk read of ir_model and ir_model_fields.
+
+        Args:
+            env: Odoo environment
+
+        Returns:
+            ModelRelationIndex instance
+        """
+        env["ir.model"].flush_model(["model", "transient"])
+        env["ir.model.fields"].flush_model(["model_id", "name", "ttype", "relation"])
+        cr = env.cr
+        cr.execute("SELECT id, model, transient FROM ir_model")
+        models = []
+        for model_id, model_name, transient in cr.fetchall():
+            model_class = env.registry.get(model_name)
+            if transient:
+                kind = "transient"
+            elif model_class is not None and model_class._abstract:
+                kind = "abstract"
+            else:
+                kind = "regular"
+            models.append((model_id, model_name, kind))
+
+        cr.execute(
+            """
+            SELECT relation, model_id, name, ttype
+              FROM ir_model_fields
+             WHERE ttype IN %s AND relation IS NOT NULL
+             ORDER BY model_id, name
+            """,
+            [RELATIONAL_TTYPES],
+        )
+        fields = cr.fetchall()
+        cr.execute("SELECT res_id, module FROM ir_model_data WHERE model = 'ir.model'")
+        model_modules = cr.fetchall()
+        _logger.debug("Loaded model relation index: %s models, %s fields", len(models), len(fields))
+        return cls(models, fields, model_modules)
+
+    def get_referencing_fields(
+        self,
+        model_name,
+        ttypes=None,
+        exclude_transient=False,
+        exclude_abstract=False,
+        exclude_models=None,
+        modules=None,
+    ):
+        """Get the relational fields pointing at a model.
+
+        Args:
+            model_name: Technical name of the referenced model
+            ttypes: Field types to include, all relational types if empty
+            exclude_transient: Skip fields owned by transient models
+            exclude_abstract: Skip fields owned by abstract models
+            exclude_models: Technical names of models whose fields are skipped
+            modules: If set, only keep fields of models defined or extended by these modules
+
+        Returns:
+            List of (model_id, field_name, ttype) tuples
+        """
+        ttypes = set(ttypes or RELATIONAL_TTYPES)
+        excluded_kinds = set()
+        if exclude_transient:
+            excluded_kinds.add("transient")
+        if exclude_abstract:
+            excluded_kinds.add("abstract")
+
+        excluded_ids = {self.model_ids[name] for name in exclude_models or () if name in self.model_ids}
+        modules = set(modules or ())
+
+        result = []
+        for (ttype, kind), fields in self.referencing.get(model_name, {}).items():
+            if ttype not in ttypes or kind in excluded_kinds:
+                continue
+            result.extend(
+                (model_id, field_name, ttype)
+                for model_id, field_name in fields
+                if model_id not in excluded_ids
+                and (not modules or not modules.isdisjoint(self.modules.get(model_id, ())))
+            )
+        return result
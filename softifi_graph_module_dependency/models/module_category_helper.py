@@ -1,24 +1,252 @@
 # -*- coding: utf-8 -*-
-from odoo import models, api
+from odoo import models, api, _
+from odoo.exceptions import UserError
+import functools
 import logging
 import re
-from typing import List, Dict, Any, Optional, Union, Tuple
+from collections import defaultdict
+from typing import List, Dict, Any, Tuple
 
 _logger = logging.getLogger(__name__)
 
+
+PATTERN_MODES = ('substring', 'prefix', 'regex')
+
+
+def _translate_like(pattern: str) -> str:
+    """Translate an ilike pattern into a regex: literal text, % and _ wildcards."""
+    return ''.join(
+        '.*' if char == '%' else '.' if char == '_' else re.escape(char)
+        for char in pattern
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_pattern(pattern: str, mode: str = 'substring'):
+    """Compile a single whitelist/blacklist pattern (case-insensitive).
+
+    Args:
+        pattern: Pattern to compile
+        mode: 'substring' (literal text as with ilike, % and _ are
+              wildcards), 'prefix' (same, anchored at the start of the name)
+              or 'regex'
+
+    Raises:
+        UserError: If the pattern is not a valid regular expression
+    """
+    if mode != 'regex':
+        pattern = _translate_like(pattern)
+        if mode == 'prefix':
+            pattern = '^' + pattern
+    try:
+        return re.compile(pattern, re.IGNORECASE)
+    except re.error as e:
+        raise UserError(_("Invalid category pattern %(pattern)r: %(error)s", pattern=pattern, error=e))
+
+
+class PatternSet:
+    """Patterns matched one by one, for regular expressions that cannot be
+    joined into one alternation (global flags, named groups, backreferences)."""
+
+    def __init__(self, compiled):
+        self.compiled = tuple(compiled)
+
+    def search(self, name: str):
+        """Get the first match of the patterns in a name, None if none matches."""
+        for regex in self.compiled:
+            match = regex.search(name)
+            if match:
+                return match
+        return None
+
+
+@functools.lru_cache(maxsize=64)
+def compile_patterns(patterns: Tuple[str, ...], mode: str = 'substring'):
+    """Compile a list of patterns into a single matcher.
+
+    Every pattern is compiled on its own first, so that an invalid one is
+    reported by name instead of through the combined expression. Patterns
+    must be validated with validate_patterns beforehand.
+
+    Literal patterns are joined into a single alternation regex. Regular
+    expressions are matched one by one, since flags, group names and group
+    numbers of one expression would leak into the others once joined.
+
+    Args:
+        patterns: Tuple of pattern strings
+        mode: How patterns are interpreted, see _compile_pattern
+
+    Returns:
+        Compiled regex (or PatternSet) matching any of the patterns, or None
+        if there are none
+
+    Raises:
+        UserError: If the patterns cannot be compiled
+    """
+    if not patterns:
+        return None
+    compiled = [_compile_pattern(pattern, mode) for pattern in patterns]
+    if mode == 'regex':
+        return compiled[0] if len(compiled) == 1 else PatternSet(compiled)
+    combined = '|'.join('(?:%s)' % regex.pattern for regex in compiled)
+    try:
+        return re.compile(combined, re.IGNORECASE)
+    except re.error as e:
+        raise UserError(_("Invalid category patterns %(patterns)r: %(error)s", patterns=list(patterns), error=e))
+
+
+def validate_patterns(value, mode='substring') -> Tuple[str, ...]:
+    """Check a whitelist/blacklist option and convert it to a hashable tuple.
+
+    Args:
+        value: A pattern string or a list of pattern strings
+        mode: Pattern mode, one of PATTERN_MODES
+
+    Raises:
+        UserError: If the value, one of its patterns or the mode is invalid
+    """
+    if mode not in PATTERN_MODES:
+        raise UserError(_("Invalid pattern mode %(mode)r, expected one of %(modes)s",
+                          mode=mode, modes=', '.join(PATTERN_MODES)))
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, (list, tuple)):
+        raise UserError(_("Invalid category patterns %(value)r: expected a list of strings", value=value))
+    for pattern in value:
+        if not isinstance(pattern, str):
+            raise UserError(_("Invalid category pattern %(pattern)r: patterns must be strings", pattern=pattern))
+    return tuple(value)
+
+
+class CategoryTree:
+    """In-memory snapshot of the ir.module.category tree.
+
+    Holds every category with its parent and complete name, the children of
+    each category and the modules of each category, so that prefix, exact
+    and subcategory resolution never needs a query. Instances are shared
+    through the registry cache and must be treated as read-only.
+    """
+
+    def __init__(self, categories, module_rows):
+        """
+        Args:
+            categories: Iterable of (id, name, parent_id) tuples
+            module_rows: Iterable of (module_id, module_name, category_id) tuples
+        """
+        self.names = {}
+        self.parents = {}
+        self.children = defaultdict(list)
+        for category_id, name, parent_id in categories:
+            self.names[category_id] = name or ''
+            self.parents[category_id] = parent_id or False
+            if parent_id:
+                self.children[parent_id].append(category_id)
+
+        self.complete_names = {
+            category_id: self._compute_complete_name(category_id)
+            for category_id in self.names
+        }
+
+        self.modules = defaultdict(list)
+        self.modules_without_category = []
+        self.module_names = {}
+        for module_id, module_name, category_id in module_rows:
+            self.module_names[module_id] = module_name
+            if category_id:
+                self.modules[category_id].append(module_id)
+            else:
+                self.modules_without_category.append(module_id)
+
+    @classmethod
+    def load(cls, env):
+        """Load the whole category tree and category→modules map.
+
+        Args:
+            env: Odoo environment (its language is used for category names)
+
+        Returns:
+            CategoryTree instance
+        """
+        categories = env['ir.module.category'].search_fetch([], ['name', 'parent_id'])
+        env['ir.module.module'].flush_model(['name', 'category_id'])
+        env.cr.execute("SELECT id, name, category_id FROM ir_module_module ORDER BY id")
+        return cls(
+            [(category.id, category.name, category.parent_id.id) for category in categories],
+            env.cr.fetchall(),
+        )
+
+    def _compute_complete_name(self, category_id):
+        """Build the 'Parent/Child' path of a category."""
+        path, seen = [], set()
+        while category_id and category_id not in seen:
+            seen.add(category_id)
+            path.append(self.names.get(category_id, ''))
+            category_id = self.parents.get(category_id)
+        return '/'.join(reversed(path))
+
+    def match_prefixes(self, prefixes, exact_match=False):
+        """Get ids of categories whose name or complete name matches a prefix.
+
+        Args:
+            prefixes: List of prefixes to match
+            exact_match: If True, only match exact names, not prefixes
+
+        Returns:
+            Set of category ids
+        """
+        if exact_match:
+            wanted = set(prefixes)
+            return {
+                category_id for category_id, name in self.names.items()
+                if name in wanted or self.complete_names[category_id] in wanted
+            }
+        prefixes = tuple(prefixes)
+        return {
+            category_id for category_id, name in self.names.items()
+            if name.startswith(prefixes) or self.complete_names[category_id].startswith(prefixes)
+        }
+
+    def expand_subcategories(self, category_ids):
+        """Get the given category ids together with all their descendants."""
+        result = set(category_ids)
+        stack = list(category_ids)
+        while stack:
+            for child_id in self.children.get(stack.pop(), []):
+                if child_id not in result:
+                    result.add(child_id)
+                    stack.append(child_id)
+        return result
+
+    def get_module_ids(self, category_ids):
+        """Get ids of the modules belonging to the given categories."""
+        module_ids = []
+        for category_id in category_ids:
+            module_ids.extend(self.modules.get(category_id, []))
+        return sorted(module_ids)
+
+
 class ModuleCategoryHelper:
     """Helper class for category-related module operations.
-    
+
     This class provides methods to find modules based on category patterns,
     supporting both whitelist and blacklist filtering with pattern matching.
+    Category lookups run against the cached CategoryTree of the registry.
     """
-    
+
     def __init__(self, env):
         self.env = env
-    
+        self._tree = None
+
+    @property
+    def tree(self):
+        """Category tree shared by all requests of the registry."""
+        if self._tree is None:
+            self._tree = self.env['ir.module.category']._get_graph_category_tree()
+        return self._tree
+
     def get_modules_by_category_prefixes(self, category_prefixes, options=None):
         """Find modules matching any of the given category prefixes.
-        
+
         Args:
             category_prefixes: List of category prefixes to match (e.g. ['custom/hr', 'custom-hr'])
             options: Optional dictionary with additional filtering options
@@ -27,174 +255,154 @@ class ModuleCategoryHelper:
                 - whitelist: List of patterns to include
                 - blacklist: List of patterns to exclude
                 - include_missing: Boolean indicating whether to include modules with no category
-            
+
         Returns:
             Recordset of ir.module.module records matching the category prefixes
         """
-        
+
         _logger.debug(
             "Getting modules by category prefixes: %s, options: %s",
             category_prefixes, options
         )
         if not category_prefixes and not options:
             return self.env['ir.module.module'].browse([])
-            
+
         options = options or {}
-        
+
         # Check if we're using the new whitelist/blacklist approach
         if any(key in options for key in ['whitelist', 'blacklist', 'include_missing']):
             return self._get_modules_by_patterns(options)
-        
+
         # Otherwise, use the original prefix-based approach
         exact_match = options.get('exact_match', False)
         include_subcategories = options.get('include_subcategories', True)
-        
-        # Build domain for category search
-        domain = self._build_category_prefix_domain(category_prefixes, exact_match)
-        
+
+        if not category_prefixes:
+            return self.env['ir.module.module'].browse([])
+
         # Get matching categories
-        categories = self.env['ir.module.category'].search(domain)
-        
+        category_ids = self.tree.match_prefixes(
+            self._normalize_category_prefixes(category_prefixes), exact_match
+        )
+
         # If including subcategories, find all child categories
-        if include_subcategories and categories:
-            child_categories = self._get_all_child_categories(categories)
-            categories |= child_categories
-        
+        if include_subcategories and category_ids:
+            category_ids = self.tree.expand_subcategories(category_ids)
+
         # Find modules in matching categories
-        if categories:
-            return self.env['ir.module.module'].search([('category_id', 'in', categories.ids)])
-        return self.env['ir.module.module'].browse([])
-    
-    def _build_category_prefix_domain(self, category_prefixes: List[str], exact_match: bool = False) -> List:
-        """Build an Odoo domain for searching categories by prefixes.
-        
+        return self.env['ir.module.module'].browse(self.tree.get_module_ids(category_ids))
+
+    def _normalize_category_prefixes(self, category_prefixes: List[str]) -> List[str]:
+        """Normalize prefixes to handle different formats (custom/hr, custom-hr).
+
         Args:
             category_prefixes: List of category prefixes to match
-            exact_match: If True, only match exact category names, not prefixes
-            
+
         Returns:
-            List representing an Odoo domain expression
+            List of prefixes including their separator variations
         """
-        if not category_prefixes:
-            return [('id', '=', False)]  # Empty domain that matches nothing
-            
-        # Normalize prefixes to handle different formats (custom/hr, custom-hr)
         normalized_prefixes = []
         for prefix in category_prefixes:
             # Add original prefix
             normalized_prefixes.append(prefix)
-            
+
             # Add variations with different separators
             if '/' in prefix:
                 normalized_prefixes.append(prefix.replace('/', '-'))
             if '-' in prefix:
                 normalized_prefixes.append(prefix.replace('-', '/'))
-        
-        # Build domain
-        domain = []
-        operator = '=' if exact_match else '=like'
-        
-        for i, prefix in enumerate(normalized_prefixes):
-            if exact_match:
-                domain_part = [('name', operator, prefix)]
-            else:
-                domain_part = [('name', operator, prefix + '%')]
-                
-            if i == 0:
-                domain = domain_part
-            else:
-                domain = ['|'] + domain_part + domain
-                
-        return domain
-    
+        return normalized_prefixes
+
     def _get_modules_by_patterns(self, options: Dict[str, Any]):
         """Find modules based on whitelist/blacklist patterns and missing category option.
-        
+
+        Patterns are compiled once into a single regex per list and matched
+        in one pass over the category names of the cached tree.
+
         Args:
             options: Dictionary with filtering options
-                - whitelist: List of patterns (plain substrings or regex) to include
+                - whitelist: List of patterns to include
                 - blacklist: List of patterns to exclude
+                - pattern_mode: 'substring' (default, literal like ilike),
+                  'prefix' or 'regex'
                 - include_missing: Boolean indicating whether to include modules with no category
                 - include_subcategories: If True, include modules from subcategories
-            
+                - match_module_names: If True, also match patterns against module technical names
+
         Returns:
             Recordset of ir.module.module records matching the criteria
+
+        Raises:
+            UserError: If the patterns are malformed, or not valid regular expressions
         """
-        # Get category domain based on whitelist/blacklist
-        category_domain = self._build_category_pattern_domain(options)
-        
+        whitelist, blacklist = self._compile_category_patterns(options)
+        tree = self.tree
+
         # Get matching categories
-        categories = self.env['ir.module.category'].search(category_domain)
-        
+        category_ids = {
+            category_id for category_id, name in tree.names.items()
+            if whitelist is None or whitelist.search(name)
+        }
+
         # If including subcategories, find all child categories
-        if options.get('include_subcategories', True) and categories:
-            child_categories = self._get_all_child_categories(categories)
-            categories |= child_categories
-        
-        # Build module domain
-        module_domain = []
-        
-        # Add category filter
-        if categories:
-            module_domain = [('category_id', 'in', categories.ids)]
-        
-        # Add missing category filter if requested
+        if options.get('include_subcategories', True) and category_ids:
+            category_ids = tree.expand_subcategories(category_ids)
+
+        if blacklist is not None:
+            category_ids = {
+                category_id for category_id in category_ids
+                if not blacklist.search(tree.names[category_id])
+            }
+
+        module_ids = set(tree.get_module_ids(category_ids))
+
+        # Add modules without category if requested
         if options.get('include_missing', False):
-            if module_domain:
-                module_domain = ['|', ('category_id', '=', False)] + module_domain
-            else:
-                module_domain = [('category_id', '=', False)]
-        elif not categories:
-            # If no categories matched and we're not including missing, return empty set
-            return self.env['ir.module.module'].browse([])
-        
-        # Find modules matching the domain
-        return self.env['ir.module.module'].search(module_domain)
-    
-    def _build_category_pattern_domain(self, options: Dict[str, Any]) -> List:
-        """Build an Odoo domain for searching categories based on whitelist/blacklist patterns.
-        
+            module_ids.update(tree.modules_without_category)
+
+        if options.get('match_module_names', False):
+            if whitelist is not None:
+                module_ids.update(
+                    module_id for module_id, name in tree.module_names.items()
+                    if whitelist.search(name)
+                )
+            if blacklist is not None:
+                module_ids = {
+                    module_id for module_id in module_ids
+                    if not blacklist.search(tree.module_names[module_id])
+                }
+
+        return self.env['ir.module.module'].browse(sorted(module_ids))
+
+    def _compile_category_patterns(self, options: Dict[str, Any]) -> Tuple[Any, Any]:
+        """Compile the whitelist and blacklist of the options.
+
         Args:
             options: Dictionary with filtering options
                 - whitelist: List of patterns to include
                 - blacklist: List of patterns to exclude
-            
+                - pattern_mode: How patterns are interpreted, see _compile_pattern
+
         Returns:
-            List representing an Odoo domain expression
+            Tuple (whitelist, blacklist) of matchers with a search method (see
+            compile_patterns), None when a list is empty
         """
-        domain = []
-        
-        # Process whitelist patterns
-        whitelist = options.get('whitelist', [])
-        if whitelist:
-            whitelist_domain = []
-            for i, pattern in enumerate(whitelist):
-                if i == 0:
-                    whitelist_domain = [('name', 'ilike', pattern)]
-                else:
-                    whitelist_domain = ['|', ('name', 'ilike', pattern)] + whitelist_domain
-            domain = whitelist_domain
-        
-        # Process blacklist patterns
-        blacklist = options.get('blacklist', [])
-        for pattern in blacklist:
-            domain = [('name', 'not ilike', pattern)] + domain
-        
-        return domain if domain else [('id', '!=', False)]  # Default to match all if no patterns
-    
+        mode = options.get('pattern_mode') or 'substring'
+        patterns = []
+        for key in ('whitelist', 'blacklist'):
+            # Validated first: unhashable values must not reach the LRU cache
+            value = validate_patterns(options.get(key) or [], mode)
+            patterns.append(compile_patterns(value, mode))
+        return tuple(patterns)
+
     def _get_all_child_categories(self, parent_categories):
-        """Recursively get all child categories of the given parent categories.
-        
+        """Get all child categories of the given parent categories.
+
         Args:
             parent_categories: Recordset of ir.module.category records
-            
+
         Returns:
             Recordset of all child categories
         """
-        all_children = self.env['ir.module.category'].browse([])
-        for category in parent_categories:
-            direct_children = category.child_ids
-            if direct_children:
-                all_children |= direct_children
-                all_children |= self._get_all_child_categories(direct_children)
-        return all_children
\ No newline at end of file
+        category_ids = self.tree.expand_subcategories(parent_categories.ids)
+        return self.env['ir.module.category'].browse(sorted(category_ids - set(parent_categories.ids)))
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from .module_graph_index import number_cycles, strongly_connected_components
+
+_logger = logging.getLogger(__name__)
+
+
+class ModuleCycleIndex:
+    """Cycles of a module graph, computed in one pass and indexed by module.
+
+    The strongly connected components of the graph are found with a single
+    linear Tarjan pass; graph responses then annotate cycle membership by
+    dictionary lookup instead of detecting cycles during their traversal.
+    Instances are shared through the registry cache and must be treated as
+    read-only.
+    """
+
+    def __init__(self, index, states=None, include_exclusions=False):
+        """
+        Args:
+            index: ModuleGraphIndex of the database
+            states: Module states to consider (e.g. ('installed',)), all modules if empty
+            include_exclusions: Whether exclusion edges close cycles too
+        """
+        module_ids = [
+            module_id for module_id, vals in index.modules.items()
+            if not states or vals['state'] in states
+        ]
+        members = set(module_ids)
+        successors = {}
+        edges = []
+        for from_id, to_id, edge_type in index.edges(include_exclusions):
+            if from_id in members and to_id in members:
+                successors.setdefault(from_id, []).append(to_id)
+                edges.append((from_id, to_id, edge_type))
+
+        self.module_count = len(module_ids)
+        self.cycle_of = number_cycles(strongly_connected_components(
+            module_ids, lambda module_id: successors.get(module_id, [])
+        ))
+        self.cycles = {}
+        for module_id, cycle_id in sorted(self.cycle_of.items()):
+            self.cycles.setdefault(cycle_id, {"modules": [], "edges": []})["modules"].append(module_id)
+        for from_id, to_id, edge_type in edges:
+            cycle_id = self.cycle_of.get(from_id)
+            if cycle_id and cycle_id == self.cycle_of.get(to_id):
+                self.cycles[cycle_id]["edges"].append((from_id, to_id, edge_type))
+        if self.cycles:
+            _logger.info("Found %s module cycles among %s modules", len(self.cycles), self.module_count)
+
+    def get_cycle_id(self, module_id):
+        """Get the id of the cycle a module belongs to, None if it is in no cycle."""
+        return self.cycle_of.get(module_id)
+
+    def annotate(self, nodes, edges):
+        """Mark the nodes and edges of a graph response that belong to a cycle.
+
+        Same marks as GraphBuilderMixin._mark_cycles_in_graph, nodes and
+        edges that are not modules (e.g. category super-nodes) are left as is.
+        """
+        for node in nodes:
+            cycle_id = self.cycle_of.get(node["id"])
+            if cycle_id:
+                node.update(in_cycle=True, cycle_id=cycle_id, type="cycleNode")
+        for edge in edges:
+            cycle_id = self.cycle_of.get(edge["from"])
+            if cycle_id and cycle_id == self.cycle_of.get(edge["to"]):
+                edge.update(in_cycle=True, cycle_id=cycle_id, type="cycleDirection")
+        return nodes, edges
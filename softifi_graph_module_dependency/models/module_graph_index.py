@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+import logging
+from collections import defaultdict, deque
+
+_logger = logging.getLogger(__name__)
+
+
+class ModuleGraphIndex:
+    """In-memory adjacency of the complete ir.module.module graph.
+
+    The index is loaded with a handful of bulk queries and then answers
+    neighbour lookups in both directions without touching the database,
+    which makes whole-installation traversals linear in the graph size.
+    """
+
+    def __init__(self, modules, dependencies, exclusions):
+        """
+        Args:
+            modules: Dictionary {id: {'name', 'state', 'category_id', 'version'}}
+            dependencies: Iterable of (module_id, dependency_name) rows
+            exclusions: Iterable of (module_id, exclusion_name) rows
+        """
+        self.modules = modules
+        self.ids_by_name = {vals['name']: module_id for module_id, vals in modules.items()}
+        # Dependency/exclusion rows reference modules by name, unknown names are kept apart
+        self.missing = defaultdict(set)
+        self.dependencies, self.reverse_dependencies = self._build_adjacency(dependencies)
+        self.exclusions, self.reverse_exclusions = self._build_adjacency(exclusions)
+
+    @classmethod
+    def load(cls, env):
+        """Load the whole module graph of the current database.
+
+        Args:
+            env: Odoo environment
+
+        Returns:
+            ModuleGraphIndex instance
+        """
+        env['ir.module.module'].flush_model()
+        env['ir.module.module.dependency'].flush_model()
+        env['ir.module.module.exclusion'].flush_model()
+        cr = env.cr
+
+        cr.execute("SELECT id, name, state, category_id, latest_version FROM ir_module_module")
+        modules = {
+            module_id: {
+                'name': name,
+                'state': state,
+                'category_id': category_id or False,
+                'version': version or False,
+            }
+            for module_id, name, state, category_id, version in cr.fetchall()
+        }
+        cr.execute("SELECT module_id, name FROM ir_module_module_dependency ORDER BY id")
+        dependencies = cr.fetchall()
+        cr.execute("SELECT module_id, name FROM ir_module_module_exclusion ORDER BY id")
+        exclusions = cr.fetchall()
+
+        _logger.debug(
+            "Loaded module graph index: %s modules, %s dependencies, %s exclusions",
+            len(modules), len(dependencies), len(exclusions)
+        )
+        return cls(modules, dependencies, exclusions)
+
+    def _build_adjacency(self, rows):
+        """Build forward and reverse adjacency lists from (module_id, name) rows."""
+        forward = defaultdict(list)
+        reverse = defaultdict(list)
+        for module_id, target_name in rows:
+            if module_id not in self.modules:
+                continue
+            target_id = self.ids_by_name.get(target_name)
+            if target_id is None:
+                self.missing[module_id].add(target_name)
+                continue
+            forward[module_id].append(target_id)
+            reverse[target_id].append(module_id)
+        return forward, reverse
+
+    def name(self, module_id):
+        return self.modules[module_id]['name']
+
+    def state(self, module_id):
+        return self.modules[module_id]['state']
+
+    def category_id(self, module_id):
+        return self.modules[module_id]['category_id']
+
+    def get_dependencies(self, module_id, reverse=False):
+        """Get ids of the modules a module depends on (or that depend on it)."""
+        adjacency = self.reverse_dependencies if reverse else self.dependencies
+        return adjacency.get(module_id, [])
+
+    def get_exclusions(self, module_id, reverse=False):
+        """Get ids of the modules a module excludes (or that exclude it)."""
+        adjacency = self.reverse_exclusions if reverse else self.exclusions
+        return adjacency.get(module_id, [])
+
+    def walk(
+        self,
+        start_ids,
+        reverse=False,
+        max_depth=None,
+        include_relations=True,
+        include_exclusions=True,
+        stop_ids=(),
+        excluded_ids=(),
+    ):
+        """Breadth-first traversal of the module graph.
+
+        Edges are oriented like the ones of get_module_graph and
+        get_reverse_dependency_graph, and only link visited modules.
+
+        Args:
+            start_ids: Ids of the modules to start from (depth 0)
+            reverse: If True, follow modules depending on/excluding the current one
+            max_depth: Maximum depth to traverse, None for no limit
+            include_relations: Whether to follow dependency edges
+            include_exclusions: Whether to follow exclusion edges
+            stop_ids: Ids of modules that are visited but not expanded
+            excluded_ids: Ids of modules that are never reached through an edge
+
+        Yields:
+            ('node', module_id, depth) and ('edge', from_id, to_id, type) tuples
+        """
+        prefix = 'reverse_' if reverse else ''
+        adjacencies = []
+        if include_relations:
+            adjacencies.append((self.reverse_dependencies if reverse else self.dependencies, prefix + 'dependency'))
+        if include_exclusions:
+            adjacencies.append((self.reverse_exclusions if reverse else self.exclusions, prefix + 'exclusion'))
+
+        depth_of = {}
+        queue = deque()
+        for module_id in start_ids:
+            if module_id in self.modules and module_id not in depth_of:
+                depth_of[module_id] = 0
+                queue.append(module_id)
+                yield 'node', module_id, 0
+
+        while queue:
+            module_id = queue.popleft()
+            depth = depth_of[module_id]
+            if module_id in stop_ids or (max_depth is not None and depth >= max_depth):
+                continue
+            for adjacency, edge_type in adjacencies:
+                for target_id in adjacency.get(module_id, []):
+                    if target_id in excluded_ids:
+                        continue
+                    if target_id not in depth_of:
+                        depth_of[target_id] = depth + 1
+                        queue.append(target_id)
+                        yield 'node', target_id, depth + 1
+                    if reverse:
+                        yield 'edge', target_id, module_id, edge_type
+                    else:
+                        yield 'edge', module_id, target_id, edge_type
+
+    def edges(self, include_exclusions=True):
+        """Iterate over all (from_id, to_id, type) edges of the installation graph."""
+        for module_id, targets in self.dependencies.items():
+            for target_id in targets:
+                yield module_id, target_id, 'dependency'
+        if include_exclusions:
+            for module_id, targets in self.exclusions.items():
+                for target_id in targets:
+                    yield module_id, target_id, 'exclusion'
+
+
+def strongly_connected_components(nodes, successors):
+    """Find the cycles of a directed graph with an iterative Tarjan pass.
+
+    Args:
+        nodes: Iterable of hashable node keys
+        successors: Function returning the successor keys of a node
+
+    Returns:
+        List of sets, one per strongly connected component that forms a
+        cycle (more than one member, or a single member with a self-loop)
+    """
+    index_of, lowlink = {}, {}
+    on_stack, stack = set(), []
+    components = []
+    counter = 0
+
+    for root in nodes:
+        if root in index_of:
+            continue
+        index_of[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(successors(root)))]
+
+        while work:
+            node, children = work[-1]
+            advanced = False
+            for child in children:
+                if child not in index_of:
+                    index_of[child] = lowlink[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(successors(child))))
+                    advanced = True
+                    break
+                if child in on_stack:
+                    lowlink[node] = min(lowlink[node], index_of[child])
+            if advanced:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index_of[node]:
+                component = set()
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.add(member)
+                    if member == node:
+                        break
+                if len(component) > 1 or node in successors(node):
+                    components.append(component)
+
+    return components
+
+
+def number_cycles(components):
+    """Give the cycles of a graph stable ids.
+
+    Args:
+        components: Sets of node ids, as returned by strongly_connected_components
+
+    Returns:
+        dict: Cycle id (starting at 1) by node id, cycles ordered by smallest member
+    """
+    cycle_of = {}
+    for cycle_id, component in enumerate(sorted(components, key=min), start=1):
+        for node_id in component:
+            cycle_of[node_id] = cycle_id
+    return cycle_of
@@ -0,0 +1,163 @@
+/** @odoo-module */
+import { loadJS, loadCSS } from "@web/core/assets";
+
+// Standalone vis-network build, shipped with the addon (see static/lib/vis-network/README.md)
+const VIS_PATH = "/softifi_graph_module_dependency/static/lib/vis-network/vis-network";
+
+// Number of nodes from which the canvas is clustered
+export const CLUSTER_THRESHOLD = 300;
+
+const CLUSTER_PREFIX = "cluster:";
+
+let visLoading = null;
+
+/**
+ * Load vis-network on first use, the library is not part of the asset
+ * bundle and is only fetched when a graph view opens.
+ * @returns {Promise<Object>} - The vis namespace
+ */
+export function loadVis() {
+  if (!visLoading) {
+    visLoading = Promise.all([
+      loadJS(`${VIS_PATH}.min.js`),
+      loadCSS(`${VIS_PATH}.css`),
+    ]).then(() => window.vis);
+    // Retry on the next graph view if the library could not be loaded
+    visLoading.catch(() => {
+      visLoading = null;
+    });
+  }
+  return visLoading;
+}
+
+/**
+ * Collapse the nodes of a large network into one cluster node per group
+ * (e.g. category or cycle), clusters are expanded on demand.
+ */
+export class NetworkClusters {
+  /**
+   * @param {Object} network - vis.Network instance
+   * @param {Object} nodes - vis.DataSet of the network nodes
+   * @param {Object} params
+   * @param {Function} params.groupOf - Returns the group key of a node, null to keep it visible
+   * @param {Function} params.labelOf - Returns the label of a group key
+   * @param {number} [params.threshold] - Number of nodes from which groups are clustered
+   */
+  constructor(network, nodes, { groupOf, labelOf, threshold = CLUSTER_THRESHOLD }) {
+    this.network = network;
+    this.nodes = nodes;
+    this.groupOf = groupOf;
+    this.labelOf = labelOf;
+    this.threshold = threshold;
+    // Member count of the clustered groups, by group key
+    this.clustered = new Map();
+    // Groups expanded by the user, not clustered again
+    this.expanded = new Set();
+  }
+
+  /**
+   * Check if a network node is a cluster of this instance
+   * @param {string|number} nodeId - Network node id
+   * @returns {boolean}
+   */
+  isCluster(nodeId) {
+    return (
+      typeof nodeId === "string" &&
+      nodeId.startsWith(CLUSTER_PREFIX) &&
+      this.network.isCluster(nodeId)
+    );
+  }
+
+  /**
+   * Expand a cluster node, its group stays expanded until reset
+   * @param {string|number} nodeId - Network node id
+   * @returns {boolean} - True if the node was a cluster
+   */
+  open(nodeId) {
+    if (!this.isCluster(nodeId)) {
+      return false;
+    }
+    const group = nodeId.slice(CLUSTER_PREFIX.length);
+    this.network.openCluster(nodeId);
+    this.clustered.delete(group);
+    this.expanded.add(group);
+    return true;
+  }
+
+  /**
+   * Expand the clusters hiding a node, e.g. when it is selected
+   * @param {string|number} nodeId - Network node id
+   */
+  reveal(nodeId) {
+    // Path from the outermost cluster down to the node itself
+    for (const clusterId of this.network.findNode(nodeId).slice(0, -1)) {
+      this.open(clusterId);
+    }
+  }
+
+  /**
+   * Cluster the groups of the network once it reaches the threshold.
+   * Only groups whose members changed are clustered again, so it can be
+   * called after every added page of nodes.
+   */
+  refresh() {
+    const nodes = this.nodes.get();
+    if (nodes.length < this.threshold) {
+      this.openAll();
+      return;
+    }
+    const groups = new Map();
+    for (const node of nodes) {
+      const group = this.groupOf(node);
+      if (group === null || group === undefined || this.expanded.has(`${group}`)) {
+        continue;
+      }
+      if (!groups.has(`${group}`)) {
+        groups.set(`${group}`, new Set());
+      }
+      groups.get(`${group}`).add(node.id);
+    }
+    for (const [group, members] of groups) {
+      if (members.size < 2 || this.clustered.get(group) === members.size) {
+        continue;
+      }
+      const clusterId = `${CLUSTER_PREFIX}${group}`;
+      if (this.network.isCluster(clusterId)) {
+        this.network.openCluster(clusterId);
+      }
+      this.network.cluster({
+        joinCondition: (nodeOptions) => members.has(nodeOptions.id),
+        clusterNodeProperties: {
+          id: clusterId,
+          label: `${this.labelOf(group)} (${members.size})`,
+          title: "Double-click to expand",
+          shape: "box",
+          borderWidth: 2,
+          font: { size: 14 },
+        },
+      });
+      this.clustered.set(group, members.size);
+    }
+  }
+
+  /**
+   * Expand all clusters, e.g. before the nodes are cleared
+   */
+  openAll() {
+    for (const group of this.clustered.keys()) {
+      const clusterId = `${CLUSTER_PREFIX}${group}`;
+      if (this.network.isCluster(clusterId)) {
+        this.network.openCluster(clusterId);
+      }
+    }
+    this.clustered.clear();
+  }
+
+  /**
+   * Expand all clusters and forget the groups expanded by the user
+   */
+  reset() {
+    this.openAll();
+    this.expanded.clear();
+  }
+}
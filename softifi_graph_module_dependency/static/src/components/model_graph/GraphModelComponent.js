@@ -2,7 +2,7 @@
 import { Component, useState, useRef, onWillStart, onMounted } from "@odoo/owl";
 import { useService } from "@web/core/utils/hooks";
 import { registry } from '@web/core/registry';
-import { loadJS, loadCSS } from "@web/core/assets";
+import { loadVis, NetworkClusters } from "../graph_network/vis_network";
 
 export class GraphModelComponent extends Component {
     static template = "model_graph_template"; // Refers to our QWeb template
@@ -30,6 +30,7 @@ export class GraphModelComponent extends Component {
         this.graphNodes = null;
         this.graphEdges = null;
         this.network = null;
+        this.clusters = null;
 
         this.containerRef = useRef("graph");
         this.orm = useService("orm");
@@ -37,44 +38,35 @@ export class GraphModelComponent extends Component {
 
         onWillStart(async () => {
             // Load vis.js library
-            await loadJS("https://cdnjs.cloudflare.com/ajax/libs/vis/4.21.0/vis.min.js");
-            await loadCSS("https://cdnjs.cloudflare.com/ajax/libs/vis/4.21.0/vis.min.css");
+            await loadVis();
 
-            // Fetch model data with module information
-            const data = await this.orm.call(
-                'ir.model',
-                'search_read',
-                [],
-                {
-                    fields: ['id', 'name', 'model', 'modules'],
-                    order: 'name',
-                }
-            );
-
-            // Fetch module data to get icons
-            const moduleData = await this.orm.call(
-                'ir.module.module',
-                'search_read',
-                [],
-                {
-                    fields: ['id', 'name', 'shortdesc', 'icon', 'icon_image'],
-                }
-            );
+            // Fetch models with their module information from the catalog,
+            // revalidated with its ETag
+            const response = await fetch("/api/graph/catalog/model", {
+                credentials: "same-origin",
+                cache: "no-cache",
+            });
+            if (!response.ok) {
+                throw new Error(`Could not load the model catalog (${response.status})`);
+            }
+            const catalog = await response.json();
+            const data = catalog.rows.map(row => Object.fromEntries(
+                catalog.columns.map((column, index) => [column, row[index]])
+            ));
 
             // Create a map of module names to their icons
             const moduleIcons = {};
-            moduleData.forEach(module => {
-                moduleIcons[module.name] = {
-                    icon: module.icon || `/base/static/img/icons/default_module_icon.png`,
-                    shortdesc: module.shortdesc
+            Object.entries(catalog.modules).forEach(([name, [shortdesc, icon]]) => {
+                moduleIcons[name] = {
+                    icon: icon || `/base/static/img/icons/default_module_icon.png`,
+                    shortdesc: shortdesc
                 };
             });
 
             // Process model data and associate with modules
             this.state.nodes = data.map(node => {
-                // Get the first module that provides this model
-                const moduleNames = node.modules ? node.modules.split(', ') : [];
-                const primaryModule = moduleNames.length > 0 ? moduleNames[0] : 'base';
+                // First module that provides this model
+                const primaryModule = node.module || 'base';
                 const moduleInfo = moduleIcons[primaryModule] || {
                     icon: `/base/static/img/icons/default_module_icon.png`,
                     shortdesc: primaryModule
@@ -141,6 +133,11 @@ export class GraphModelComponent extends Component {
                         }
                     }
                 );
+                // Large graphs are collapsed by module
+                this.clusters = new NetworkClusters(this.network, this.graphNodes, {
+                    groupOf: node => node.moduleInfo ? node.moduleInfo.moduleName : null,
+                    labelOf: moduleName => moduleName,
+                });
 
                 // Set up network event handlers
                 this.setupNetworkEvents();
@@ -152,9 +149,12 @@ export class GraphModelComponent extends Component {
      * Set up event handlers for the vis.js network
      */
     setupNetworkEvents() {
-        // Double-click to show model information
+        // Double-click to expand a cluster or show model information
         this.network.on("doubleClick", (params) => {
             const modelId = params.nodes[0];
+            if (this.clusters.open(modelId)) {
+                return;
+            }
             if (modelId) {
                 this.showModelInfo(modelId);
             }
@@ -166,7 +166,7 @@ export class GraphModelComponent extends Component {
             params.event.stopPropagation();
 
             const nodeId = params.nodes[0];
-            if (nodeId) {
+            if (nodeId && !this.clusters.isCluster(nodeId)) {
                 this.graphNodes.remove(nodeId);
                 this.state.selectedModels.delete(nodeId);
             }
@@ -274,6 +274,7 @@ export class GraphModelComponent extends Component {
      */
     async refreshGraphWithNewDepth() {
         // Clear current graph data
+        this.clusters.reset();
         this.graphNodes.clear();
         this.graphEdges.clear();
         
@@ -358,6 +359,7 @@ export class GraphModelComponent extends Component {
             });
 
             this.graphEdges.update(edges);
+            this.clusters.refresh();
         } catch (error) {
             console.error("Error fetching model graph data:", error);
         }
@@ -376,6 +378,7 @@ export class GraphModelComponent extends Component {
         }
 
         // Update the graph with the selected model
+        this.clusters.reveal(modelId);
         this.graphNodes.update([this.createNodeObject(originalNode)]);
         this.state.selectedModels.add(modelId);
 
@@ -2,10 +2,13 @@
 import { Component, useState, useRef, onWillStart, onMounted } from "@odoo/owl";
 import { useService } from "@web/core/utils/hooks";
 import { registry } from "@web/core/registry";
-import { loadJS, loadCSS } from "@web/core/assets";
+import { loadVis, NetworkClusters } from "../graph_network/vis_network";
 
 const DEFAULT_MODULE_ICON = `/base/static/img/icons/default_module_icon.png`;
 
+// Number of modules fetched per graph page
+const GRAPH_PAGE_SIZE = 200;
+
 const DEFAULT_STATE_COLOR = {
   uninstallable: "#eaeaa4",
   installed: "#97c2fc",
@@ -31,6 +34,31 @@ const DEFAULT_NETWORK_OPTIONS = {
   },
 };
 
+/**
+ * Fetch the module list in compact form and expand it to module objects.
+ * The browser cache keeps the catalog until the module graph changes.
+ * @returns {Promise<Object[]>} - Modules as returned by search_read
+ */
+export async function fetchModuleCatalog() {
+  const response = await fetch("/api/graph/catalog/module", {
+    credentials: "same-origin",
+    cache: "no-cache",
+  });
+  if (!response.ok) {
+    throw new Error(`Could not load the module catalog (${response.status})`);
+  }
+  const { columns, rows, categories } = await response.json();
+  return rows.map((row) => {
+    const module = Object.fromEntries(
+      columns.map((column, index) => [column, row[index]])
+    );
+    if (module.category_id) {
+      module.category_id = [module.category_id, categories[module.category_id]];
+    }
+    return module;
+  });
+}
+
 export class GraphModuleComponent extends Component {
   static template = "module_graphe_template";
 
@@ -75,6 +103,9 @@ export class GraphModuleComponent extends Component {
     this.graphNodes = null;
     this.graphEdges = null;
     this.network = null;
+    this.clusters = null;
+    // Incremented when the graph is cleared, to drop pages still loading
+    this.graphRequest = 0;
     this.containerRef = useRef("graph");
     this.dropdownStateRef = useRef("dropdownState");
     this.dropdownCategoryRef = useRef("dropdownCategory");
@@ -83,27 +114,10 @@ export class GraphModuleComponent extends Component {
 
     onWillStart(async () => {
       // Load vis.js library
-      await loadJS(
-        "https://cdnjs.cloudflare.com/ajax/libs/vis/4.21.0/vis.min.js"
-      );
-      await loadCSS(
-        "https://cdnjs.cloudflare.com/ajax/libs/vis/4.21.0/vis.min.css"
-      );
+      await loadVis();
 
-      // Fetch module data
-      const data = await this.orm.call("ir.module.module", "search_read", [], {
-        fields: [
-          "id",
-          "name",
-          "shortdesc",
-          "state",
-          "icon",
-          "category_id",
-          "application",
-          "module_type",
-        ],
-        order: "shortdesc",
-      });
+      // Fetch module data from the catalog, revalidated with its ETag
+      const data = await fetchModuleCatalog();
 
       // Process module data
       this.state.nodes = data.map((node) => ({
@@ -165,6 +179,25 @@ export class GraphModuleComponent extends Component {
           },
           DEFAULT_NETWORK_OPTIONS
         );
+        // Large graphs are collapsed by cycle, then by category
+        this.clusters = new NetworkClusters(this.network, this.graphNodes, {
+          groupOf: (node) => {
+            if (this.state.selectedModules.has(node.id)) {
+              return null;
+            }
+            if (node.cycleId) {
+              return `cycle-${node.cycleId}`;
+            }
+            return node.categoryId ? `category-${node.categoryId}` : null;
+          },
+          labelOf: (group) => {
+            const [kind, id] = group.split("-");
+            if (kind === "cycle") {
+              return `Cycle ${id}`;
+            }
+            return this.state.availableCategories.get(parseInt(id))?.name || group;
+          },
+        });
         // Set up network event handlers
         this.setupNetworkEvents();
       }
@@ -175,9 +208,12 @@ export class GraphModuleComponent extends Component {
    * Set up event handlers for the vis.js network
    */
   setupNetworkEvents() {
-    // Double-click to show module information
+    // Double-click to expand a cluster or show module information
     this.network.on("doubleClick", (params) => {
       const moduleId = params.nodes[0];
+      if (this.clusters.open(moduleId)) {
+        return;
+      }
       if (moduleId) {
         this.showModuleInfo(moduleId);
       }
@@ -189,7 +225,7 @@ export class GraphModuleComponent extends Component {
       params.event.stopPropagation();
 
       const nodeId = params.nodes[0];
-      if (nodeId) {
+      if (nodeId && !this.clusters.isCluster(nodeId)) {
         this.graphNodes.remove(nodeId);
         this.state.selectedModules.delete(nodeId);
       }
@@ -221,6 +257,8 @@ export class GraphModuleComponent extends Component {
           : node.color || DEFAULT_STATE_COLOR[node.state],
       },
       state: node.state,
+      categoryId: node.category_id ? node.category_id[0] : false,
+      cycleId: dataNode.cycle_id || false,
       image: iconPath,
       shapeProperties: {
         useBorderWithImage: true,
@@ -446,6 +484,7 @@ export class GraphModuleComponent extends Component {
     }
 
     // Update the graph with the selected module
+    this.clusters.reveal(moduleId);
     this.graphNodes.update([this.createNodeObject(moduleNode)]);
 
     this.state.loading = true;
@@ -463,45 +502,23 @@ export class GraphModuleComponent extends Component {
           ? "get_module_graph"
           : "get_reverse_dependency_graph";
 
-      // Call the server method with the options
-      const data = await this.orm.call(
-        "ir.module.module",
-        method,
-        [moduleIds],
-        { options }
-      );
-      console.log({ data });
-
-      this.graphNodes.update(
-        data.nodes.map((node) => this.createNodeObject(node))
-      );
-
-      const edges = [];
-      const graphEdges = Object.values(this.graphEdges._data);
-
-      data.edges.forEach((edge) => {
-        const existingEdge = graphEdges.find(
-          (e) => e.from == edge.from && e.to == edge.to
+      // Fetch the graph page by page, rendering each page as it arrives,
+      // until the last page or until the graph is cleared
+      const request = this.graphRequest;
+      let cursor = null;
+      do {
+        const data = await this.orm.call(
+          "ir.module.module",
+          method,
+          [moduleIds],
+          { options: { ...options, page_size: GRAPH_PAGE_SIZE, cursor } }
         );
-
-        if (!existingEdge) {
-          const newEdge = {
-            from: edge.from,
-            to: edge.to,
-          };
-
-          if (edge.type === "cycleDirection") {
-            newEdge.color = {
-              color: "red",
-              highlight: "red",
-            };
-          }
-
-          this.state.edges.push(newEdge);
-          edges.push(newEdge);
+        if (request !== this.graphRequest) {
+          return;
         }
-      });
-      this.graphEdges.update(edges);
+        this.applyGraphData(data);
+        cursor = data.next_cursor;
+      } while (cursor);
       this.state.selectedModules.add(moduleId);
     } catch (error) {
       console.error("Error fetching module graph data:", error);
@@ -510,6 +527,44 @@ export class GraphModuleComponent extends Component {
     }
   }
 
+  /**
+   * Add the nodes and edges of a graph (page) to the network
+   * @param {Object} data - Graph data with nodes and edges
+   */
+  applyGraphData(data) {
+    this.graphNodes.update(
+      data.nodes.map((node) => this.createNodeObject(node)).filter(Boolean)
+    );
+
+    const edges = [];
+    const graphEdges = this.graphEdges.get();
+
+    data.edges.forEach((edge) => {
+      const existingEdge = graphEdges.find(
+        (e) => e.from == edge.from && e.to == edge.to
+      );
+
+      if (!existingEdge) {
+        const newEdge = {
+          from: edge.from,
+          to: edge.to,
+        };
+
+        if (edge.type === "cycleDirection") {
+          newEdge.color = {
+            color: "red",
+            highlight: "red",
+          };
+        }
+
+        this.state.edges.push(newEdge);
+        edges.push(newEdge);
+      }
+    });
+    this.graphEdges.update(edges);
+    this.clusters.refresh();
+  }
+
   /**
    * Updates max depth setting
    * @param {Event} event Change event from input
@@ -581,8 +636,8 @@ export class GraphModuleComponent extends Component {
    * @returns {boolean} - True if the module is in the graph
    */
   isModuleInGraph(moduleId) {
-    return this.graphNodes?._data
-      ? Object.keys(this.graphNodes._data).some((nodeId) => nodeId == moduleId)
+    return this.graphNodes
+      ? this.graphNodes.getIds().some((nodeId) => nodeId == moduleId)
       : false;
   }
   /**
@@ -600,6 +655,8 @@ export class GraphModuleComponent extends Component {
   }
 
   onClearGraph() {
+    this.graphRequest++;
+    this.clusters.reset();
     this.graphEdges.clear();
     this.graphNodes.clear();
     this.state.selectedModules = new Set();
@@ -620,12 +677,13 @@ export class GraphModuleComponent extends Component {
    */
   removeSelectedModule(moduleId) {
     this.state.selectedModules.delete(moduleId);
-    if (this.graphNodes && this.graphNodes._data[moduleId]) {
+    if (this.graphNodes && this.graphNodes.get(moduleId)) {
       this.graphNodes.remove(moduleId);
     }
     // Optionally remove related edges
     if (this.graphEdges) {
-      const edgesToRemove = Object.values(this.graphEdges._data)
+      const edgesToRemove = this.graphEdges
+        .get()
         .filter((e) => e.from == moduleId || e.to == moduleId)
         .map((e) => e.id);
       this.graphEdges.remove(edgesToRemove);